@@ -10,9 +10,12 @@ Kör:
   python app.py
 """
 
-from nicegui import ui
+from nicegui import app, ui
 
-import oldcore.core as core
+import core
+import core_aio
+import draw_jobs
+import metrics
 import ui_user
 import ui_admin
 import os
@@ -20,6 +23,18 @@ import time
 
 # init DB on startup
 core.init_db()
+draw_jobs.fail_stale()
+
+app.on_shutdown(draw_jobs.shutdown)
+app.on_shutdown(core_aio.shutdown)
+
+if metrics.ENABLED:
+    from starlette.responses import PlainTextResponse
+
+    @app.get('/metrics')
+    def metrics_endpoint() -> PlainTextResponse:
+        # Prometheus textformat; slås på med METRICS=1
+        return PlainTextResponse(metrics.render(), media_type='text/plain; version=0.0.4')
 
 # register pages
 ui_user.register_user_pages()
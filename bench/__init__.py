@@ -0,0 +1 @@
+"""Benchmarks för core. Körs från repo-roten, t.ex. `python -m bench.db_connections`."""
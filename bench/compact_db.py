@@ -0,0 +1,92 @@
+"""Kontroll av core.compact_db: gallrade dragningar och krympt databasfil.
+
+Bygger ett syntetiskt event, gör --runs dragningar med gallringen avstängd
+(RUNS_KEEP = 0) och kör sedan compact_db(keep=--keep, vacuum=True).
+Kontrollerar att bara de --keep senaste dragningarna finns kvar (runs och
+allocations), att deras resultat är oförändrade och att filen faktiskt
+krympt: färre sidor, inga lediga sidor kvar och mindre fil på disk.
+Avslutar med fel annars.
+
+Kör:
+  python -m bench.compact_db [--participants 2000] [--runs 30] [--keep 5]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import tempfile
+from typing import Dict, List, Optional
+
+import core
+from bench import synthetic
+
+
+def pragma(name: str) -> int:
+    return int(core.q_one(f'PRAGMA {name}')[0])
+
+
+def counts() -> Dict[str, int]:
+    return {
+        'runs': int(core.q_one('SELECT COUNT(*) FROM runs')[0]),
+        'allocations': int(core.q_one('SELECT COUNT(*) FROM allocations')[0]),
+        'page_count': pragma('page_count'),
+        'freelist_count': pragma('freelist_count'),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument('--participants', type=int, default=2000)
+    ap.add_argument('--runs', type=int, default=30, help='dragningar före komprimeringen')
+    ap.add_argument('--keep', type=int, default=5, help='dragningar som ska finnas kvar')
+    ap.add_argument('--seed', type=int, default=1)
+    args = ap.parse_args(argv)
+    if not 0 < args.keep < args.runs:
+        raise SystemExit('--keep måste vara mellan 1 och --runs - 1')
+
+    with tempfile.TemporaryDirectory() as tmp:
+        core.DB_PATH = os.path.join(tmp, 'compact.db')
+        core.RUNS_KEEP = 0
+        core.init_db()
+        synthetic.write_db(synthetic.generate(args.participants, seed=args.seed))
+        run_ids = [core.run_draw(f'compact-{k}').run_id for k in range(args.runs)]
+        kept = run_ids[-args.keep:]
+        expected = {r: [tuple(row) for row in core.get_results(r)] for r in kept}
+        kept_allocations = sum(len(rows) for rows in expected.values())
+
+        before = counts()
+        res = core.compact_db(keep=args.keep, vacuum=True)
+        after = counts()
+        results_after = {r: [tuple(row) for row in core.get_results(r)] for r in kept}
+        left = [r['id'] for r in core.list_runs()]
+        core.close_db()
+
+    print(f"{args.participants} deltagare, {args.runs} dragningar, behåll {args.keep}\n")
+    print(f"{'':<16}{'före':>12}{'efter':>12}")
+    for key, was in before.items():
+        print(f'{key:<16}{was:>12,}{after[key]:>12,}')
+    print(f"{'fil KiB':<16}{res['bytes_before'] / 1024:>12,.0f}{res['bytes_after'] / 1024:>12,.0f}")
+
+    failures = []
+    if res['pruned_runs'] != args.runs - args.keep:
+        failures.append(f"pruned_runs {res['pruned_runs']}, väntade {args.runs - args.keep}")
+    if sorted(left) != sorted(kept):
+        failures.append('fel dragningar finns kvar')
+    if after['allocations'] != kept_allocations:
+        failures.append(f"{after['allocations']} allocations kvar, väntade {kept_allocations}")
+    if results_after != expected:
+        failures.append('resultaten för kvarvarande dragningar har ändrats')
+    if after['page_count'] >= before['page_count']:
+        failures.append('page_count minskade inte')
+    if after['freelist_count'] != 0:
+        failures.append(f"{after['freelist_count']} lediga sidor kvar efter VACUUM")
+    if res['bytes_after'] >= res['bytes_before']:
+        failures.append('databasfilen krympte inte')
+    if failures:
+        raise SystemExit('\nFEL: ' + '; '.join(failures))
+    print('\ngamla dragningar borttagna, kvarvarande oförändrade, filen krympt')
+
+
+if __name__ == '__main__':
+    main()
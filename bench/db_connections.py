@@ -0,0 +1,92 @@
+"""Jämför frågor/sekund: ny anslutning per fråga (gamla core.db()) mot trådens
+återanvända anslutning (core.db() / core.tx()).
+
+Kör:
+  python -m bench.db_connections [--participants 300] [--items 200] [--seconds 2]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from typing import Callable, List, Optional, Tuple
+
+import core
+
+TOTALS_SQL = """
+    SELECT i.id, i.name, i.category, i.quantity,
+           COALESCE(SUM(v.points), 0) AS total_points,
+           COALESCE(SUM(CASE WHEN v.points > 0 THEN 1 ELSE 0 END), 0) AS voters
+    FROM items i
+    LEFT JOIN votes v ON v.item_id = i.id
+    GROUP BY i.id, i.name, i.category, i.quantity
+    ORDER BY (COALESCE(SUM(v.points), 0)) DESC, i.category, i.name
+"""
+META_SQL = "SELECT value FROM meta WHERE key = 'votes_version'"
+
+
+def old_q_all(sql: str, params: Tuple = ()) -> List[sqlite3.Row]:
+    """Så som core.q_all såg ut före anslutningslagret."""
+    con = sqlite3.connect(core.DB_PATH, check_same_thread=False)
+    con.row_factory = sqlite3.Row
+    rows = con.execute(sql, params).fetchall()
+    con.close()
+    return rows
+
+
+def seed_db(n_participants: int, n_items: int) -> None:
+    core.init_db()
+    rng = random.Random(1)
+    core.exec_many(
+        'INSERT INTO items(name, category, quantity) VALUES(?, ?, ?)',
+        [(f'Artikel {i}', f'Kat {i % 12}', rng.randint(1, 3)) for i in range(n_items)],
+    )
+    item_ids = [int(r['id']) for r in core.q_all('SELECT id FROM items')]
+    for p in range(n_participants):
+        pid = core.get_or_create_participant(f'Deltagare {p}')
+        picks = rng.sample(item_ids, min(10, len(item_ids)))
+        core.upsert_votes(pid, {iid: 10 for iid in picks})
+
+
+def qps(fn: Callable[[], object], seconds: float) -> float:
+    n = 0
+    t0 = time.perf_counter()
+    deadline = t0 + seconds
+    while True:
+        fn()
+        n += 1
+        now = time.perf_counter()
+        if now >= deadline:
+            return n / (now - t0)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument('--participants', type=int, default=300)
+    ap.add_argument('--items', type=int, default=200)
+    ap.add_argument('--seconds', type=float, default=2.0)
+    args = ap.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        core.DB_PATH = os.path.join(tmp, 'bench.db')
+        seed_db(args.participants, args.items)
+
+        cases = [
+            ('meta lookup', META_SQL),
+            ('item totals aggregate', TOTALS_SQL),
+        ]
+        print(f'{"query":<24}{"before q/s":>14}{"after q/s":>14}{"speedup":>10}')
+        for label, sql in cases:
+            before = qps(lambda: old_q_all(sql), args.seconds)
+            after = qps(lambda: core.q_all(sql), args.seconds)
+            print(f'{label:<24}{before:>14.0f}{after:>14.0f}{after / before:>9.1f}x')
+
+        core.close_db()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,169 @@
+"""Import av artikelkatalog från en stor CSV eller .xlsx.
+
+Lägen:
+  full    parse_items_file + import_items (hela filen i minnet, pd.read_csv/read_excel)
+  stream  import_items_file (import_items_csv / import_items_xlsx, block om --chunk rader)
+  old     iterrows + separat exec_many, så som handle_upload gjorde tidigare
+
+Varje läge körs i en egen process så att topp-RSS går att jämföra.
+
+Före mätningen kontrolleras att strömmande import i små block ger exakt samma
+artiklar som parse_items_file, för en liten fil med knepiga celler (numeriska
+namn, tomma celler, 'NA', inledande nollor) i både csv och xlsx.
+
+Kör:
+  python -m bench.import_items [--rows 200000] [--modes full,stream,old] [--chunk 50000]
+  python -m bench.import_items --format xlsx --rows 100000
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from typing import List, Optional
+
+import core
+
+
+def write_csv(path: str, n_rows: int, seed: int = 1) -> None:
+    rng = random.Random(seed)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('Name,Category,Quantity\n')
+        for i in range(n_rows):
+            f.write(f'Artikel {i},Kategori {rng.randint(1, 40)},{rng.randint(1, 5)}\n')
+
+
+def write_xlsx(path: str, n_rows: int, seed: int = 1) -> None:
+    from openpyxl import Workbook
+
+    rng = random.Random(seed)
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet()
+    ws.append(['Name', 'Category', 'Quantity', 'Notering'])
+    for i in range(n_rows):
+        ws.append([f'Artikel {i}', f'Kategori {rng.randint(1, 40)}', rng.randint(1, 5), 'lager B'])
+    wb.save(path)
+
+
+# (name, category, quantity) som celler; None = tom cell. Blocken om 3 rader
+# blandar numeriska namn med tomma celler i vissa block men inte i andra.
+TRICKY_ROWS = [
+    (7, 'Verktyg', 2), (8, 'Verktyg', 1), (9, None, 1),
+    (10, 'Lampor', None), ('Skruv', 'Verktyg', 3), (None, 'Tomt namn', 1),
+    ('NA', 'Text', 1), ('007', 'Text', 1), (12.5, 'Decimal', 0),
+    (11, 'Sista', 1),
+]
+
+
+def check_same_as_parse(tmp: str, chunk: int = 3) -> None:
+    """Avslutar med fel om import_items_file i block inte ger samma artiklar som parse_items_file."""
+    import csv
+    from openpyxl import Workbook
+
+    csv_path = os.path.join(tmp, 'tricky.csv')
+    with open(csv_path, 'w', encoding='utf-8', newline='') as f:
+        w = csv.writer(f)
+        w.writerow(['Name', 'Category', 'Quantity'])
+        w.writerows([['' if c is None else c for c in row] for row in TRICKY_ROWS])
+    xlsx_path = os.path.join(tmp, 'tricky.xlsx')
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet()
+    ws.append(['Name', 'Category', 'Quantity'])
+    for row in TRICKY_ROWS:
+        ws.append(list(row))
+    wb.save(xlsx_path)
+
+    core.DB_PATH = os.path.join(tmp, 'check.db')
+    core.init_db()
+    for path in (csv_path, xlsx_path):
+        name = os.path.basename(path)
+        with open(path, 'rb') as f:
+            df = core.parse_items_file(f.read(), name)
+        expected = [(r.name, r.category, int(r.quantity)) for r in df.itertuples()]
+        core.import_items_file(path, name, chunk_rows=chunk)
+        stored = [(r['name'], r['category'], int(r['quantity']))
+                  for r in core.q_all('SELECT name, category, quantity FROM items ORDER BY id')]
+        if stored != expected:
+            raise SystemExit(f'MISMATCH {name}: i block {stored}, parse_items_file {expected}')
+        print(f'{name}: strömmande import i block om {chunk} = parse_items_file ({len(stored)} rader)')
+    core.close_db()
+
+
+def old_import(df) -> None:
+    """Så som ui_admin.handle_upload importerade före core.import_items."""
+    params = [
+        (str(r['name']), str(r.get('category', '')), int(r.get('quantity', 1)))
+        for _, r in df.iterrows()
+    ]
+    with core.tx():
+        core.clear_items_and_votes_and_allocations()
+        core.exec_many('INSERT INTO items(name, category, quantity) VALUES(?, ?, ?)', params)
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss är KiB på Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_mode(mode: str, path: str, db_path: str, chunk: int) -> None:
+    """Körs i barnprocessen; skriver en resultatrad."""
+    core.DB_PATH = db_path
+    core.init_db()
+    base = peak_rss_mb()
+
+    t0 = time.perf_counter()
+    if mode == 'stream':
+        n = core.import_items_file(path, os.path.basename(path), chunk_rows=chunk).rows
+    else:
+        with open(path, 'rb') as f:
+            df = core.parse_items_file(f.read(), os.path.basename(path))
+        if mode == 'full':
+            core.import_items(df)
+        else:
+            old_import(df)
+        n = len(df)
+    dt = time.perf_counter() - t0
+
+    stored = core.q_one('SELECT COUNT(*) AS n FROM items')['n']
+    if stored != n:
+        raise SystemExit(f'MISMATCH: {stored} rader i items, väntade {n}')
+    print(f'{mode:<8}{dt:>8.2f} s{n / dt:>12,.0f} rader/s{peak_rss_mb():>10.0f} MB topp-RSS'
+          f'  (+{peak_rss_mb() - base:.0f} MB)')
+    core.close_db()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument('--rows', type=int, default=200_000)
+    ap.add_argument('--modes', default='full,stream')
+    ap.add_argument('--format', choices=('csv', 'xlsx'), default='csv')
+    ap.add_argument('--chunk', type=int, default=core.ITEMS_CHUNK_ROWS)
+    ap.add_argument('--child', nargs=3, metavar=('MODE', 'FILE', 'DB'), help=argparse.SUPPRESS)
+    args = ap.parse_args(argv)
+
+    if args.child:
+        run_mode(*args.child, chunk=args.chunk)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        check_same_as_parse(tmp)
+        path = os.path.join(tmp, f'items.{args.format}')
+        (write_xlsx if args.format == 'xlsx' else write_csv)(path, args.rows)
+        print(f'{args.rows} rader, {os.path.getsize(path) / 1e6:.1f} MB {args.format}')
+        for mode in args.modes.split(','):
+            db_path = os.path.join(tmp, f'{mode}.db')
+            subprocess.run(
+                [sys.executable, '-m', 'bench.import_items', '--chunk', str(args.chunk),
+                 '--child', mode, path, db_path],
+                check=True,
+            )
+
+
+if __name__ == '__main__':
+    main()
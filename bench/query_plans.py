@@ -0,0 +1,99 @@
+"""Kontrollerar att de heta frågorna använder sina index (EXPLAIN QUERY PLAN).
+
+Skapar en tom databas med init_db (alla migrationer) och avslutar med fel om
+någon fråga saknar förväntat index i planen. Med --db kontrolleras en
+befintlig databas i stället (efter init_db, dvs. uppgraderad).
+
+Kör:
+  python -m bench.query_plans [--db raffle.db]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import tempfile
+from typing import List, Optional, Tuple
+
+import core
+
+# (namn, fråga, parametrar, text som ska finnas i planen)
+HOT_QUERIES: List[Tuple[str, str, Tuple, str]] = [
+    (
+        'get_results',
+        'SELECT a.id FROM allocations a JOIN items i ON i.id = a.item_id WHERE a.run_id = ?',
+        ('run_x',),
+        'idx_allocations_run',
+    ),
+    (
+        'get_latest_run_id',
+        'SELECT id FROM runs ORDER BY created_at DESC, rowid DESC LIMIT 1',
+        (),
+        'idx_runs_created',
+    ),
+    (
+        'delete_participant (allocations)',
+        'DELETE FROM allocations WHERE participant_id = ?',
+        (1,),
+        'idx_allocations_participant',
+    ),
+    (
+        'votes per artikel',
+        'SELECT participant_id, points FROM votes WHERE item_id = ?',
+        (1,),
+        'idx_votes_item',
+    ),
+    (
+        'list_items',
+        'SELECT id, name, category, quantity FROM items ORDER BY category, name',
+        (),
+        'idx_items_category_name',
+    ),
+    (
+        'list_participants',
+        'SELECT id, name, created_at FROM participants ORDER BY created_at, name',
+        (),
+        'idx_participants_created',
+    ),
+    (
+        'votes per deltagare',
+        'SELECT item_id, points FROM votes WHERE participant_id = ?',
+        (1,),
+        'sqlite_autoindex_votes_1',
+    ),
+]
+
+
+def plan(sql: str, params: Tuple) -> List[str]:
+    return [str(r['detail']) for r in core.q_all('EXPLAIN QUERY PLAN ' + sql, params)]
+
+
+def check() -> List[str]:
+    """Namn på frågor vars plan saknar förväntat index."""
+    bad = []
+    for name, sql, params, index in HOT_QUERIES:
+        steps = plan(sql, params)
+        ok = any(index in step for step in steps)
+        print(f'{"ok " if ok else "FEL"} {name:<34} {" | ".join(steps)}')
+        if not ok:
+            bad.append(name)
+    return bad
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument('--db', help='befintlig databas (standard: ny tom databas)')
+    args = ap.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        core.DB_PATH = args.db or os.path.join(tmp, 'plans.db')
+        core.init_db()
+        print(f'schema version {core.schema_version()}')
+        bad = check()
+        core.close_db()
+    if bad:
+        raise SystemExit(f'{len(bad)} frågor använder inte sitt index: {", ".join(bad)}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""WeightedSampler mot core.weighted_choice.
+
+1) Determinism: samma seed ska ge exakt samma index som weighted_choice, även
+   när vikter ändras (vinnare får lägre vikt, slutsålda tas bort).
+2) Tid per enskilt urval (sample + set) för växande n. Det är inte tiden per
+   unit i en lottning, där snapshoten av vikterna kostar O(n) ändå; se
+   bench.draw_engines för hela lottningar.
+
+Kör:
+  python -m bench.sampler [--steps 20000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import time
+from typing import Dict, List, Optional
+
+import core
+from sampler import WeightedSampler
+
+
+def check_identical(n: int, steps: int, seed: int) -> int:
+    gen = random.Random(seed)
+    weights = [gen.choice([0.0, gen.randint(1, 100) * gen.choice([1.0, 0.6, 0.35, 0.2, 0.1])]) for _ in range(n)]
+    weights[0] = 1.0
+    picker = WeightedSampler(weights)
+    rng_a = random.Random(f'{seed}-draw')
+    rng_b = random.Random(f'{seed}-draw')
+
+    for step in range(steps):
+        as_dict: Dict[int, float] = {i: w for i, w in enumerate(weights) if w > 0}
+        if not as_dict:
+            break
+        a = picker.sample(rng_a)
+        b = core.weighted_choice(rng_b, as_dict)
+        if a != b:
+            raise SystemExit(f'MISMATCH n={n} steg={step}: sampler={a} weighted_choice={b}')
+        # vinnaren straffas eller tas bort, som i lottningen
+        new_w = weights[a] * gen.choice([0.6, 0.35, 0.0])
+        weights[a] = new_w
+        picker.set(a, new_w)
+    return step + 1
+
+
+def per_draw_us(n: int, draws: int) -> tuple:
+    gen = random.Random(n)
+    weights = [float(gen.randint(1, 100)) for _ in range(n)]
+    as_dict = dict(enumerate(weights))
+    picker = WeightedSampler(weights)
+    rng = random.Random(1)
+
+    t0 = time.perf_counter()
+    for _ in range(draws):
+        i = picker.sample(rng)
+        picker.set(i, weights[i])
+    tree = (time.perf_counter() - t0) / draws * 1e6
+
+    t0 = time.perf_counter()
+    for _ in range(draws):
+        core.weighted_choice(rng, as_dict)
+    linear = (time.perf_counter() - t0) / draws * 1e6
+    return tree, linear
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument('--steps', type=int, default=20_000)
+    args = ap.parse_args(argv)
+
+    for n, seed in [(1, 1), (7, 2), (100, 3), (5_000, 4)]:
+        done = check_identical(n, min(args.steps, n * 4), seed)
+        print(f'identiskt: n={n:<6} {done} dragningar')
+
+    print(f'{"n":>8}{"sampler µs":>14}{"linjär µs":>14}')
+    for n in (100, 1_000, 10_000, 100_000):
+        tree, linear = per_draw_us(n, 2_000 if n <= 10_000 else 200)
+        print(f'{n:>8}{tree:>14.1f}{linear:>14.1f}')
+
+
+if __name__ == '__main__':
+    main()
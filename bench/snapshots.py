@@ -0,0 +1,50 @@
+"""Storlek och tid för weight_snapshot: JSON-text mot binärt format (snapshots.py).
+
+Kör:
+  python -m bench.snapshots [--participants 10000] [--units 5000] [--items 2000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import time
+from typing import List, Optional
+
+import core
+import snapshots
+from bench.draw_engines import synthetic_input
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument('--participants', type=int, default=10_000)
+    ap.add_argument('--units', type=int, default=5_000)
+    ap.add_argument('--items', type=int, default=2_000)
+    ap.add_argument('--picks', type=int, default=10)
+    args = ap.parse_args(argv)
+
+    data = synthetic_input(args.participants, args.items, args.units, args.picks)
+    snaps = [snap for _, _, snap in core.allocate(data, 'bench')]
+
+    t0 = time.perf_counter()
+    as_json = [json.dumps(s) for s in snaps]
+    t_json = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    as_bin = [snapshots.encode(s) for s in snaps]
+    t_bin = time.perf_counter() - t0
+
+    for s, j, b in zip(snaps, as_json, as_bin):
+        if snapshots.decode(b) != snapshots.decode(j):
+            raise SystemExit('MISMATCH: binär och JSON avkodas olika')
+
+    mb_json = sum(len(x) for x in as_json) / 1e6
+    mb_bin = sum(len(x) for x in as_bin) / 1e6
+    print(f'{len(snaps)} snapshots')
+    print(f'json    {mb_json:>9.1f} MB  {t_json:>7.2f} s')
+    print(f'binary  {mb_bin:>9.1f} MB  {t_bin:>7.2f} s  ({mb_json / mb_bin:.1f}x mindre)')
+
+
+if __name__ == '__main__':
+    main()
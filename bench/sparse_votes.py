@@ -0,0 +1,194 @@
+"""Före/efter för migration 3 (glesa röster): storlek på votes och frågetider.
+
+Bygger en databas på schema 2 där varje inlämning har en rad per artikel,
+0 poäng för de flesta, så som /vote sparade tidigare (bench.synthetic ger
+fördelningen). Mäter radantal, storlek (tabell + index, efter VACUUM) och
+tider för de frågor som läser votes, kör sedan init_db (migration 3) och
+mäter igen.
+
+Kontrollerar också att semantiken är oförändrad: totalpoäng och antal
+röstande per artikel, vote_sum och submitted per deltagare samt lottningen
+för samma seed ska vara identiska före och efter. Avslutar med fel annars.
+
+Kör:
+  python -m bench.sparse_votes [--participants 2000] [--items 200] [--repeat 5]
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import os
+import sqlite3
+import statistics
+import tempfile
+import time
+from typing import Callable, Dict, List, Optional
+
+import core
+from bench import synthetic
+
+# Frågorna så som de såg ut på schema 2 (samma resultat som dagens på glesa votes)
+OLD_TOTALS_SQL = """
+    SELECT i.id AS item_id,
+           COALESCE(SUM(v.points), 0) AS total_points,
+           COALESCE(SUM(CASE WHEN v.points > 0 THEN 1 ELSE 0 END), 0) AS voters
+    FROM items i
+    LEFT JOIN votes v ON v.item_id = i.id
+    GROUP BY i.id
+"""
+OLD_SUMMARY_SQL = """
+    SELECT p.id, p.name, p.created_at,
+           COALESCE(SUM(v.points), 0) AS vote_sum,
+           COUNT(v.item_id) AS vote_count,
+           (COUNT(v.item_id) > 0 OR ? = 0) AS submitted
+    FROM participants p
+    LEFT JOIN votes v ON v.participant_id = p.id
+    GROUP BY p.id, p.name, p.created_at
+    ORDER BY p.created_at, p.name
+"""
+OLD_SUBMITTED_SQL = 'SELECT COUNT(*) AS c FROM votes WHERE participant_id = ?'
+
+VOTES_OBJECTS = ('votes', 'sqlite_autoindex_votes_1', 'idx_votes_item')
+
+
+def build_dense(n_participants: int, n_items: Optional[int], seed: int) -> None:
+    """Schema 2 och röster med en rad per artikel för varje inlämning."""
+    with core.tx() as con:
+        cur = con.cursor()
+        for version, _desc, migrate in core.MIGRATIONS:
+            if version <= 2:
+                migrate(cur)
+        con.execute('PRAGMA user_version = 2')
+
+    event = synthetic.generate(n_participants, n_items, seed=seed)
+    with core.tx() as con:
+        # inte core.import_items: den skriver kolumner som kommer först i migration 3
+        con.executemany('INSERT INTO items(name, category, quantity) VALUES(?, ?, ?)', event.items)
+        item_ids = [int(r[0]) for r in con.execute('SELECT id FROM items ORDER BY id')]
+        con.executemany(
+            'INSERT INTO participants(name, created_at) VALUES(?, ?)',
+            [(name, 1_700_000_000 + p) for p, name in enumerate(event.participants)],
+        )
+        pids = [int(r[0]) for r in con.execute('SELECT id FROM participants ORDER BY id')]
+        con.executemany(
+            'INSERT INTO votes(participant_id, item_id, points) VALUES(?, ?, ?)',
+            (
+                (pids[p], iid, votes.get(i, 0))
+                for p, votes in event.votes.items()
+                for i, iid in enumerate(item_ids)
+            ),
+        )
+        core.bump_meta('items_version')
+        core.bump_meta('votes_version')
+
+
+def votes_bytes() -> Optional[int]:
+    """Sidor för votes och dess index (None om SQLite saknar dbstat)."""
+    marks = ','.join('?' * len(VOTES_OBJECTS))
+    try:
+        row = core.q_one(f'SELECT SUM(pgsize) AS b FROM dbstat WHERE name IN ({marks})', VOTES_OBJECTS)
+    except sqlite3.OperationalError:
+        return None
+    return int(row['b'] or 0)
+
+
+def file_bytes() -> int:
+    row = core.q_one('PRAGMA page_count')
+    return int(row[0]) * int(core.q_one('PRAGMA page_size')[0])
+
+
+def timed(fn: Callable[[], object], repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return statistics.median(times)
+
+
+Query = Callable[[], List[sqlite3.Row]]
+
+
+def draw_hash() -> str:
+    return hashlib.md5(repr(list(core.allocate(core.load_draw_input(), 'sparse'))).encode()).hexdigest()
+
+
+def snapshot(totals: Query, summary: Query, submitted: Callable[[int], bool]) -> Dict[str, object]:
+    """Det som ska vara oförändrat: aggregat, inlämnad-status och lottningen."""
+    rows = [(int(r['id']), int(r['vote_sum']), bool(r['submitted'])) for r in summary()]
+    return {
+        'totals': [tuple(r) for r in totals()],
+        'summary': rows,
+        'has_submitted': [submitted(pid) for pid, _s, _sub in rows],
+        'draw': draw_hash(),
+    }
+
+
+def measure(repeat: int, totals: Query, summary: Query, submitted: Callable[[int], bool]) -> Dict[str, float]:
+    pids = [int(r['id']) for r in core.q_all('SELECT id FROM participants')]
+    return {
+        'votes rader': core.q_one('SELECT COUNT(*) FROM votes')[0],
+        'votes + index KiB': (votes_bytes() or 0) / 1024,
+        'databasfil KiB': file_bytes() / 1024,
+        'totalaggregat ms': timed(totals, repeat) * 1000,
+        'deltagaröversikt ms': timed(summary, repeat) * 1000,
+        'has_submitted alla ms': timed(lambda: [submitted(p) for p in pids], repeat) * 1000,
+        'load_draw_input ms': timed(core.load_draw_input, repeat) * 1000,
+    }
+
+
+def old_has_submitted(pid: int) -> bool:
+    row = core.q_one(OLD_SUBMITTED_SQL, (pid,))
+    return int(row['c']) > 0 or core.POINT_BUDGET == 0
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument('--participants', type=int, default=2000)
+    ap.add_argument('--items', type=int, default=None, help='standard: som bench.synthetic')
+    ap.add_argument('--repeat', type=int, default=5)
+    ap.add_argument('--seed', type=int, default=1)
+    args = ap.parse_args(argv)
+
+    old = (
+        lambda: core.q_all(OLD_TOTALS_SQL),
+        lambda: core.q_all(OLD_SUMMARY_SQL, (core.POINT_BUDGET,)),
+        old_has_submitted,
+    )
+    new = (
+        lambda: core.q_all(core._ITEM_TOTALS_FROM_VOTES),
+        core._load_participants_with_vote_summary,
+        core.participant_has_submitted,
+    )
+
+    with tempfile.TemporaryDirectory() as tmp:
+        core.DB_PATH = os.path.join(tmp, 'sparse.db')
+        build_dense(args.participants, args.items, args.seed)
+        core.db().execute('VACUUM')
+        before_state = snapshot(*old)
+        before = measure(args.repeat, *old)
+
+        t0 = time.perf_counter()
+        core.init_db()
+        migrate_s = time.perf_counter() - t0
+        core.db().execute('VACUUM')
+        after_state = snapshot(*new)
+        after = measure(args.repeat, *new)
+        core.close_db()
+
+    print(f'{args.participants} deltagare, migration 3 tog {migrate_s * 1000:.0f} ms\n')
+    print(f"{'':<24}{'före':>12}{'efter':>12}{'kvot':>8}")
+    for key, was in before.items():
+        now = after[key]
+        ratio = f'{now / was:.2f}' if was else '-'
+        print(f'{key:<24}{was:>12,.1f}{now:>12,.1f}{ratio:>8}')
+
+    bad = [k for k in before_state if before_state[k] != after_state[k]]
+    if bad:
+        raise SystemExit(f'\nMISMATCH: {", ".join(bad)} skiljer sig före/efter')
+    print('\nidentiska totaler, inlämnad-status och lottning före/efter')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,210 @@
+"""Benchmarksvit över ett syntetiskt event (bench.synthetic) i flera storlekar.
+
+Per storlek (antal deltagare) byggs en ny databas i en temporär katalog och
+följande mäts, varje fall --repeat gånger:
+
+  parse_items_file              artikelfilen som csv
+  list_items_with_point_totals  kall cache (core.clear_cache() före varje varv)
+  upsert_votes                  --upserts deltagare lämnar in på nytt, ny fördelning
+                                varje varv (tid per anrop)
+  run_draw                      hela lottningen inkl. skrivning
+  get_results                   resultatet för senaste dragningen
+
+Resultatet skrivs som JSON (--out). Med --baseline jämförs medianerna mot en
+sparad körning, och fall som blivit mer än --tolerance långsammare (och minst
+--min-delta-ms) flaggas; då avslutas körningen med kod 1. --save-baseline
+skriver resultatet som ny baslinje. Baslinjen är maskinberoende och checkas
+inte in.
+
+Kör:
+  python -m bench.suite                                   # 100, 1k, 10k, 50k
+  python -m bench.suite --scales 100,1000 --repeat 3
+  python -m bench.suite --save-baseline                   # före en ändring
+  python -m bench.suite --baseline bench/baseline.json    # efter
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+import core
+from bench import synthetic
+
+DEFAULT_SCALES = (100, 1_000, 10_000, 50_000)
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), 'baseline.json')
+
+
+def measure(fn: Callable[[], object], repeat: int, setup: Optional[Callable[[], None]] = None) -> Dict[str, float]:
+    times: List[float] = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return {'median': statistics.median(times), 'min': min(times), 'n': len(times)}
+
+
+def bench_scale(n_participants: int, repeat: int, upserts: int, engine: Optional[str], seed: int) -> dict:
+    t0 = time.perf_counter()
+    event = synthetic.generate(n_participants, seed=seed)
+    synthetic.check(event)
+    csv_bytes = synthetic.items_csv(event)
+    results: Dict[str, Dict[str, float]] = {}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        core.DB_PATH = os.path.join(tmp, 'bench.db')
+        core.clear_cache()
+        core.init_db()
+        pids, item_ids = synthetic.write_db(event)
+        setup_s = time.perf_counter() - t0
+
+        results['parse_items_file'] = measure(lambda: core.parse_items_file(csv_bytes, 'items.csv'), repeat)
+        results['list_items_with_point_totals'] = measure(core.list_items_with_point_totals, repeat, core.clear_cache)
+
+        # samma deltagare lämnar in en ny, giltig fördelning, en ny för varje
+        # varv: upsert_votes skriver bara ändrade rader, så samma inlämning
+        # två gånger mäter bara vägen där inget ändras
+        rng = random.Random(seed)
+        voters = [p for p in event.votes][:upserts]
+        budget = synthetic.point_budget()
+        rounds = [
+            [
+                (pids[p], dict(zip(
+                    rng.sample(item_ids, len(event.votes[p])),
+                    synthetic.split_points(rng, len(event.votes[p]), budget, core.MAX_PER_ITEM),
+                )))
+                for p in voters
+            ]
+            for _ in range(repeat)
+        ]
+        batches: List[Tuple[int, Dict[int, int]]] = []
+
+        def next_round() -> None:
+            batches[:] = rounds.pop()
+
+        def upsert_all() -> None:
+            for pid, votes in batches:
+                core.upsert_votes(pid, votes)
+
+        if voters:
+            per_batch = measure(upsert_all, repeat, next_round)
+            results['upsert_votes'] = {
+                'median': per_batch['median'] / len(voters),
+                'min': per_batch['min'] / len(voters),
+                'n': per_batch['n'] * len(voters),
+            }
+
+        runs: List[str] = []
+        results['run_draw'] = measure(lambda: runs.append(core.run_draw(f'bench-{len(runs)}', engine).run_id), repeat)
+        results['get_results'] = measure(lambda: core.get_results(runs[-1]), repeat)
+        core.close_db()
+
+    return {
+        'participants': n_participants,
+        'submitted': len(event.votes),
+        'vote_rows': event.vote_rows,
+        'items': len(event.items),
+        'units': event.units,
+        'setup_seconds': setup_s,
+        'results': results,
+    }
+
+
+def environment(engine: Optional[str]) -> dict:
+    return {
+        'created_at': int(time.time()),
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'engine': engine or core.DRAW_ENGINE,
+        'point_budget': core.POINT_BUDGET,
+        'max_per_item': core.MAX_PER_ITEM,
+    }
+
+
+def compare(current: dict, baseline: dict, tolerance: float, min_delta_ms: float) -> List[str]:
+    """Rader för varje fall vars median ökat mer än tolerance (andel) och min_delta_ms."""
+    flagged: List[str] = []
+    base_scales = {str(s['participants']): s for s in baseline.get('scales', [])}
+    for scale in current['scales']:
+        base = base_scales.get(str(scale['participants']))
+        if base is None:
+            continue
+        for name, res in scale['results'].items():
+            ref = base['results'].get(name)
+            if ref is None:
+                continue
+            new, old = res['median'], ref['median']
+            if new > old * (1 + tolerance) and (new - old) * 1000 >= min_delta_ms:
+                flagged.append(
+                    f"{scale['participants']:>7} {name:<30} {old * 1000:>10.2f} ms -> {new * 1000:>10.2f} ms"
+                    f"  ({new / old - 1:+.0%})"
+                )
+    return flagged
+
+
+def print_table(report: dict) -> None:
+    print(f"{'deltagare':>9}  {'fall':<30}{'median':>12}{'min':>12}")
+    for scale in report['scales']:
+        for name, res in scale['results'].items():
+            print(f"{scale['participants']:>9}  {name:<30}{res['median'] * 1000:>9.2f} ms{res['min'] * 1000:>9.2f} ms")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument('--scales', default=','.join(str(s) for s in DEFAULT_SCALES), help='antal deltagare, kommaseparerat')
+    ap.add_argument('--repeat', type=int, default=5)
+    ap.add_argument('--upserts', type=int, default=200, help='inlämningar per varv i upsert_votes')
+    ap.add_argument('--engine', choices=core.DRAW_ENGINES)
+    ap.add_argument('--seed', type=int, default=1)
+    ap.add_argument('--out', default='bench_results.json')
+    ap.add_argument('--baseline', help=f'jämför mot denna fil (t.ex. {BASELINE_PATH})')
+    ap.add_argument('--save-baseline', nargs='?', const=BASELINE_PATH, help='spara resultatet som baslinje')
+    ap.add_argument('--tolerance', type=float, default=0.25, help='tillåten ökning av medianen (andel)')
+    ap.add_argument('--min-delta-ms', type=float, default=1.0, help='mindre ökningar räknas som brus')
+    args = ap.parse_args(argv)
+
+    scales = [int(s) for s in args.scales.split(',') if s.strip()]
+    report = {'environment': environment(args.engine), 'scales': []}
+    for n in scales:
+        t0 = time.perf_counter()
+        scale = bench_scale(n, args.repeat, args.upserts, args.engine, args.seed)
+        report['scales'].append(scale)
+        print(f"{n} deltagare: {scale['vote_rows']} röster, {scale['items']} artiklar, {scale['units']} units"
+              f" ({time.perf_counter() - t0:.1f} s)", file=sys.stderr)
+
+    print_table(report)
+    with open(args.out, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f'\nskrev {args.out}')
+    if args.save_baseline:
+        with open(args.save_baseline, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f'skrev baslinje {args.save_baseline}')
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        flagged = compare(report, baseline, args.tolerance, args.min_delta_ms)
+        if flagged:
+            print(f'\nREGRESSION mot {args.baseline} (mer än {args.tolerance:.0%} långsammare):')
+            for line in flagged:
+                print('  ' + line)
+            raise SystemExit(1)
+        print(f'\ninga regressioner mot {args.baseline}')
+
+
+if __name__ == '__main__':
+    main()
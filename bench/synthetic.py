@@ -0,0 +1,197 @@
+"""Syntetiskt event för benchmarks: deltagare, artiklar och röster.
+
+Reproducerbart (samma seed ger samma event) och realistiskt skevt:
+- artiklar i kategorier, de flesta med antal 1, några med fler
+- popularitet enligt Zipf: ett fåtal artiklar får många röster
+- de flesta röstar på ett fåtal artiklar och lägger ojämnt med poäng
+- en del deltagare registrerar sig men lämnar aldrig in
+
+Varje inlämning fördelar exakt core.POINT_BUDGET poäng (100 om budgeten är
+avstängd) och högst core.MAX_PER_ITEM per artikel, som röstsidan kräver.
+
+Kör (skriver en databas att titta på):
+  python -m bench.synthetic --participants 1000 --db /tmp/event.db
+"""
+
+from __future__ import annotations
+
+import argparse
+import io
+import itertools
+import math
+import random
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+
+import core
+
+
+@dataclass
+class Event:
+    items: List[Tuple[str, str, int]]                          # (name, category, quantity)
+    participants: List[str]
+    votes: Dict[int, Dict[int, int]] = field(default_factory=dict)   # deltagarindex -> {artikelindex: poäng}
+
+    @property
+    def units(self) -> int:
+        return sum(q for _, _, q in self.items)
+
+    @property
+    def vote_rows(self) -> int:
+        return sum(len(v) for v in self.votes.values())
+
+
+def point_budget() -> int:
+    return core.POINT_BUDGET or 100
+
+
+def split_points(rng: random.Random, k: int, budget: int, cap: int) -> List[int]:
+    """Skev fördelning av budget på k artiklar; varje del är 1..cap (cap 0 = inget tak)."""
+    if cap > 0 and k * cap < budget:
+        raise ValueError(f'{k} artiklar räcker inte för {budget} poäng med max {cap} per artikel')
+    shares = sorted((rng.expovariate(1.0) ** 1.5 for _ in range(k)), reverse=True)
+    total = sum(shares)
+    parts = [1 + int((budget - k) * s / total) for s in shares]
+    if cap > 0:
+        parts = [min(p, cap) for p in parts]
+    # resten ett poäng i taget, störst andel först, så länge taket tillåter
+    rest = budget - sum(parts)
+    for i in itertools.cycle(range(k)):
+        if rest == 0:
+            break
+        if cap <= 0 or parts[i] < cap:
+            parts[i] += 1
+            rest -= 1
+    return parts
+
+
+def generate(
+    n_participants: int,
+    n_items: Optional[int] = None,
+    n_units: Optional[int] = None,
+    submit_share: float = 0.9,
+    seed: int = 1,
+) -> Event:
+    """Event med n_participants deltagare.
+
+    Standard: en artikel per tio deltagare (minst 20) och units för drygt
+    hälften av deltagarna.
+    """
+    rng = random.Random(seed)
+    budget = point_budget()
+    cap = core.MAX_PER_ITEM
+    n_items = n_items or max(20, n_participants // 10)
+    n_units = max(n_items, n_units or int(n_participants * 0.6))
+    n_categories = max(3, min(40, round(math.sqrt(n_items))))
+    min_picks = -(-budget // cap) if cap > 0 else 1
+    if min_picks > n_items:
+        raise ValueError(f'{n_items} artiklar räcker inte för {budget} poäng med max {cap} per artikel')
+
+    quantities = [1] * n_items
+    # fler units på ett fåtal artiklar (t.ex. kartonger med samma sak)
+    bulky = rng.sample(range(n_items), max(1, n_items // 8))
+    for _ in range(n_units - n_items):
+        quantities[rng.choice(bulky)] += 1
+    items = [
+        (f'Artikel {i + 1:05d}', f'Kategori {rng.randrange(n_categories) + 1:02d}', quantities[i])
+        for i in range(n_items)
+    ]
+
+    popularity = list(itertools.accumulate(1.0 / (k + 1) ** 0.9 for k in range(n_items)))
+    order = list(range(n_items))
+    rng.shuffle(order)  # populäraste artiklarna ska inte vara de första i filen
+
+    event = Event(items=items, participants=[f'Deltagare {p + 1:06d}' for p in range(n_participants)])
+    for p in range(n_participants):
+        if rng.random() >= submit_share:
+            continue
+        k = min(n_items, budget, max(min_picks, 1 + int(rng.paretovariate(1.0))))
+        chosen: set = set()
+        while len(chosen) < k:
+            chosen.add(order[rng.choices(range(n_items), cum_weights=popularity)[0]])
+        parts = split_points(rng, k, budget, cap)
+        event.votes[p] = dict(zip(rng.sample(sorted(chosen), k), parts))
+    return event
+
+
+def check(event: Event) -> None:
+    """Avslutar med fel om någon inlämning bryter mot budget eller tak."""
+    budget = point_budget()
+    cap = core.MAX_PER_ITEM
+    for p, votes in event.votes.items():
+        if sum(votes.values()) != budget:
+            raise SystemExit(f'deltagare {p}: summa {sum(votes.values())}, väntade {budget}')
+        if any(v < 1 or (cap > 0 and v > cap) for v in votes.values()):
+            raise SystemExit(f'deltagare {p}: poäng utanför 1..{cap or "∞"}')
+
+
+def items_frame(event: Event) -> pd.DataFrame:
+    return pd.DataFrame(event.items, columns=['name', 'category', 'quantity'])
+
+
+def items_csv(event: Event) -> bytes:
+    return items_frame(event).to_csv(index=False).encode('utf-8')
+
+
+def items_xlsx(event: Event) -> bytes:
+    buf = io.BytesIO()
+    items_frame(event).to_excel(buf, index=False)
+    return buf.getvalue()
+
+
+def write_db(event: Event) -> Tuple[List[int], List[int]]:
+    """Skriver eventet till core.DB_PATH (som måste vara tom efter init_db).
+
+    Returnerar (deltagar-id, artikel-id) i eventets ordning.
+    """
+    core.import_items(items_frame(event))
+    item_ids = [int(r['id']) for r in core.q_all('SELECT id FROM items ORDER BY id')]
+    if len(item_ids) != len(event.items):
+        raise SystemExit('databasen var inte tom')
+
+    with core.tx() as con:
+        con.executemany(
+            'INSERT INTO participants(name, created_at) VALUES(?, ?)',
+            [(name, 1_700_000_000 + p) for p, name in enumerate(event.participants)],
+        )
+        pids = [int(r[0]) for r in con.execute('SELECT id FROM participants ORDER BY id')]
+        con.executemany(
+            'INSERT INTO votes(participant_id, item_id, points) VALUES(?, ?, ?)',
+            (
+                (pids[p], item_ids[i], pts)
+                for p, votes in event.votes.items()
+                for i, pts in votes.items()
+            ),
+        )
+        con.execute(
+            'UPDATE participants SET submitted_at = created_at '
+            'WHERE id IN (SELECT DISTINCT participant_id FROM votes)'
+        )
+        core.bump_meta('participants_version')
+        core.bump_meta('votes_version')
+    return pids, item_ids
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument('--participants', type=int, default=1000)
+    ap.add_argument('--items', type=int, default=None)
+    ap.add_argument('--units', type=int, default=None)
+    ap.add_argument('--seed', type=int, default=1)
+    ap.add_argument('--db', required=True, help='ny databasfil att skriva')
+    args = ap.parse_args(argv)
+
+    event = generate(args.participants, args.items, args.units, seed=args.seed)
+    check(event)
+    core.DB_PATH = args.db
+    core.init_db()
+    write_db(event)
+    core.close_db()
+    print(f'{len(event.participants)} deltagare ({len(event.votes)} inlämnade, {event.vote_rows} röster), '
+          f'{len(event.items)} artiklar, {event.units} units -> {args.db}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,259 @@
+"""Lasttest: många deltagare som trycker "Spara" på /vote samtidigt.
+
+Varje simulerad deltagare registrerar sig (get_or_create_participant) och
+lämnar sedan in --saves gånger: läser sina röster, väntar en slumpad
+betänketid och sparar med core.upsert_votes, först en ny giltig fördelning
+och sedan rättelser (några poäng flyttas). Som /vote skickas en post per
+artikel, de flesta med 0 (--sparse: bara artiklar med poäng). Under
+tiden läser --readers trådar totalsidan (list_items_with_point_totals), som
+de öppna sidorna gör efter varje votes_version.
+
+Lägen:
+  threads  en tråd per deltagare direkt mot core (värsta fall: alla skriver på en gång)
+  aio      en coroutine per deltagare via core_aio.run, dvs. samma trådpool
+           (CORE_AIO_WORKERS) som NiceGUI-sidorna använder
+
+Sparandet går över NiceGUI:s websocket och inte över ett HTTP-anrop, så
+testet driver core på samma sätt som servern gör i stället för att gå via
+en startad app.
+
+Rapporterar latens för sparandet (p50/p90/p99/max), antal 'database is
+locked' och andra fel, samt genomströmning (inlämningar/s).
+
+Kör:
+  python -m bench.vote_load [--participants 300] [--saves 3] [--think-ms 200] [--mode threads|aio]
+  python -m bench.vote_load --busy-timeout-ms 50      # gör låsfel synliga
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+import core
+from bench import synthetic
+
+
+@dataclass
+class LoadStats:
+    latencies: List[float] = field(default_factory=list)   # sekunder per lyckad upsert_votes
+    errors: Counter = field(default_factory=Counter)
+    reads: int = 0
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def ok(self, seconds: float) -> None:
+        with self.lock:
+            self.latencies.append(seconds)
+
+    def error(self, ex: Exception) -> None:
+        kind = 'database is locked' if 'locked' in str(ex) else f'{type(ex).__name__}: {ex}'
+        with self.lock:
+            self.errors[kind] += 1
+
+
+def percentile(values: List[float], p: float) -> float:
+    if not values:
+        return 0.0
+    xs = sorted(values)
+    return xs[min(len(xs) - 1, int(round(p / 100 * (len(xs) - 1))))]
+
+
+def _new_votes(rng: random.Random, item_ids: List[int], previous: Optional[Dict[int, int]], full_form: bool) -> Dict[int, int]:
+    """En giltig inlämning med samma skeva antal artiklar som bench.synthetic.
+
+    Har deltagaren redan lämnat in flyttas några poäng mellan två artiklar
+    (en rättelse). full_form: som /vote, en post per artikel, 0 för de flesta.
+    """
+    budget = synthetic.point_budget()
+    cap = core.MAX_PER_ITEM
+    previous = {iid: pts for iid, pts in (previous or {}).items() if pts > 0}
+    if previous:
+        votes = dict(previous)
+        src = rng.choice(list(votes))
+        dst = rng.choice(item_ids)
+        move = rng.randint(1, votes[src])
+        if cap > 0:
+            move = min(move, cap - votes.get(dst, 0))
+        if dst != src and move > 0:
+            votes[src] -= move
+            votes[dst] = votes.get(dst, 0) + move
+        votes = {iid: pts for iid, pts in votes.items() if pts > 0}
+    else:
+        min_picks = -(-budget // cap) if cap > 0 else 1
+        n = min(len(item_ids), budget, max(min_picks, 1 + int(rng.paretovariate(1.0))))
+        votes = dict(zip(rng.sample(item_ids, n), synthetic.split_points(rng, n, budget, cap)))
+    if full_form:
+        return {iid: votes.get(iid, 0) for iid in item_ids}
+    return votes
+
+
+def _participant(
+    k: int, item_ids: List[int], saves: int, think_ms: float, full_form: bool, seed: int, stats: LoadStats,
+) -> None:
+    """En deltagares besök, synkront (körs i en tråd)."""
+    rng = random.Random(f'{seed}-{k}')
+    try:
+        pid = core.get_or_create_participant(f'Last {k:05d}')
+    except sqlite3.OperationalError as ex:
+        stats.error(ex)
+        return
+    for _ in range(saves):
+        current = core.get_votes_for_participant(pid)
+        time.sleep(rng.uniform(0, think_ms) / 1000)
+        votes = _new_votes(rng, item_ids, current, full_form)
+        t0 = time.perf_counter()
+        try:
+            core.upsert_votes(pid, votes)
+        except sqlite3.OperationalError as ex:
+            stats.error(ex)
+        else:
+            stats.ok(time.perf_counter() - t0)
+
+
+def _reader(stop: threading.Event, stats: LoadStats) -> None:
+    while not stop.is_set():
+        try:
+            core.list_items_with_point_totals()
+        except sqlite3.OperationalError as ex:
+            stats.error(ex)
+        else:
+            with stats.lock:
+                stats.reads += 1
+        time.sleep(0.01)
+    core.close_db()
+
+
+def run_threads(
+    n: int, item_ids: List[int], saves: int, think_ms: float, full_form: bool, seed: int, stats: LoadStats,
+) -> None:
+    start = threading.Barrier(n)
+
+    def visit(k: int) -> None:
+        start.wait()
+        try:
+            _participant(k, item_ids, saves, think_ms, full_form, seed, stats)
+        finally:
+            core.close_db()
+
+    threads = [threading.Thread(target=visit, args=(k,), daemon=True) for k in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+
+def run_aio(
+    n: int, item_ids: List[int], saves: int, think_ms: float, full_form: bool, seed: int, stats: LoadStats,
+) -> None:
+    import core_aio
+
+    async def visit(k: int) -> None:
+        # som sidan: varje anrop mot core går via poolen, betänketiden i loopen
+        rng = random.Random(f'{seed}-{k}')
+        try:
+            pid = await core_aio.run(core.get_or_create_participant, f'Last {k:05d}')
+        except sqlite3.OperationalError as ex:
+            stats.error(ex)
+            return
+        for _ in range(saves):
+            current = await core_aio.run(core.get_votes_for_participant, pid)
+            await asyncio.sleep(rng.uniform(0, think_ms) / 1000)
+            votes = _new_votes(rng, item_ids, current, full_form)
+            t0 = time.perf_counter()
+            try:
+                await core_aio.run(core.upsert_votes, pid, votes)
+            except sqlite3.OperationalError as ex:
+                stats.error(ex)
+            else:
+                stats.ok(time.perf_counter() - t0)
+
+    async def main() -> None:
+        await asyncio.gather(*(visit(k) for k in range(n)))
+
+    try:
+        asyncio.run(main())
+    finally:
+        core_aio.shutdown()
+
+
+def report(stats: LoadStats, wall: float, args: argparse.Namespace) -> None:
+    lat = [x * 1000 for x in stats.latencies]
+    attempts = len(lat) + sum(stats.errors.values())
+    journal = core.q_one('PRAGMA journal_mode')[0]
+    print(f'{args.participants} deltagare x {args.saves} inlämningar, läge {args.mode}, '
+          f'journal {journal}, busy_timeout {core.DB_BUSY_TIMEOUT_MS} ms, {args.readers} läsare')
+    print(f'  lyckade        {len(lat)}/{attempts}')
+    if lat:
+        print(f'  latens ms      p50 {percentile(lat, 50):.1f}  p90 {percentile(lat, 90):.1f}  '
+              f'p99 {percentile(lat, 99):.1f}  max {max(lat):.1f}  (medel {statistics.fmean(lat):.1f})')
+    print(f'  genomströmning {len(lat) / wall:.0f} inlämningar/s ({wall:.2f} s)')
+    print(f'  läsningar      {stats.reads} list_items_with_point_totals')
+    locked = stats.errors.pop('database is locked', 0)
+    print(f'  låsfel         {locked} "database is locked"')
+    for kind, n in stats.errors.most_common():
+        print(f'  fel            {n} x {kind}')
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument('--participants', type=int, default=300, help='samtidiga deltagare')
+    ap.add_argument('--saves', type=int, default=3, help='inlämningar per deltagare')
+    ap.add_argument('--think-ms', type=float, default=200.0, help='max betänketid före varje spara')
+    ap.add_argument('--readers', type=int, default=4, help='trådar som läser totalsidan under tiden')
+    ap.add_argument('--sparse', action='store_true', help='skicka bara artiklar med poäng (standard: hela formuläret som /vote)')
+    ap.add_argument('--mode', choices=('threads', 'aio'), default='threads')
+    ap.add_argument('--event', type=int, default=1000, help='storlek på det syntetiska eventet (deltagare)')
+    ap.add_argument('--busy-timeout-ms', type=int, default=None, help='standard: core.DB_BUSY_TIMEOUT_MS')
+    ap.add_argument('--seed', type=int, default=1)
+    ap.add_argument('--db', help='kör mot en kopia av den här databasen i stället för ett syntetiskt event')
+    args = ap.parse_args(argv)
+
+    if args.busy_timeout_ms is not None:
+        core.DB_BUSY_TIMEOUT_MS = args.busy_timeout_ms
+
+    with tempfile.TemporaryDirectory() as tmp:
+        core.DB_PATH = os.path.join(tmp, 'load.db')
+        if args.db:
+            src = sqlite3.connect(args.db)
+            dst = sqlite3.connect(core.DB_PATH)
+            src.backup(dst)
+            src.close()
+            dst.close()
+            core.init_db()
+        else:
+            core.init_db()
+            synthetic.write_db(synthetic.generate(args.event, seed=args.seed))
+        item_ids = [int(r['id']) for r in core.q_all('SELECT id FROM items ORDER BY id')]
+        if not item_ids:
+            raise SystemExit('inga artiklar att rösta på')
+
+        stats = LoadStats()
+        stop = threading.Event()
+        readers = [threading.Thread(target=_reader, args=(stop, stats), daemon=True) for _ in range(args.readers)]
+        for t in readers:
+            t.start()
+
+        runner = run_threads if args.mode == 'threads' else run_aio
+        t0 = time.perf_counter()
+        runner(args.participants, item_ids, args.saves, args.think_ms, not args.sparse, args.seed, stats)
+        wall = time.perf_counter() - t0
+
+        stop.set()
+        for t in readers:
+            t.join()
+        report(stats, wall, args)
+        core.close_db()
+
+
+if __name__ == '__main__':
+    main()
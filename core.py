@@ -15,22 +15,36 @@ nds av ui_user.py och ui_admin.py.
 
 from __future__ import annotations
 
+import asyncio
 import io
 import json
+import logging
 import os
 import random
 import sqlite3
+import threading
 import time
-from dataclasses import dataclass
-from typing import Dict, List, Optional, Tuple
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import IO, Any, Callable, Dict, FrozenSet, Iterable, Iterator, List, Optional, Set, Tuple, Union
 
 import pandas as pd
 
+import metrics
+import snapshots
+
+log = logging.getLogger(__name__)
+
 DB_PATH = os.environ.get('DB_PATH', 'raffle.db')
 POINT_BUDGET = int(os.environ.get('POINT_BUDGET', '100'))
 MAX_PER_ITEM = int(os.environ.get('MAX_PER_ITEM', '0'))  # 0 = no max
 ADMIN_PASSWORD = os.environ.get('ADMIN_PASSWORD', 'admin')
 
+# SQLite-tuning (per anslutning)
+DB_CACHE_KB = int(os.environ.get('DB_CACHE_KB', '16384'))  # page cache, KiB
+DB_MMAP_BYTES = int(os.environ.get('DB_MMAP_BYTES', str(64 * 1024 * 1024)))
+DB_BUSY_TIMEOUT_MS = int(os.environ.get('DB_BUSY_TIMEOUT_MS', '5000'))
+
 # Win-penalty multipliers (editable)
 WIN_MULT = {
     0: 1.00,
@@ -45,15 +59,110 @@ def mult_for_wins(w: int) -> float:
     return WIN_MULT.get(w, MULT_AFTER)
 
 
-def db() -> sqlite3.Connection:
-    con = sqlite3.connect(DB_PATH, check_same_thread=False)
+# ---------------- Connections ----------------
+#
+# En anslutning per tråd (och process), återanvänds mellan anrop. Anslutningen
+# körs i autocommit-läge; skrivningar grupperas explicit med tx().
+
+_local = threading.local()
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    con = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
     con.row_factory = sqlite3.Row
+    con.execute(f'PRAGMA busy_timeout = {DB_BUSY_TIMEOUT_MS}')
+    con.execute('PRAGMA journal_mode = WAL')
+    con.execute('PRAGMA synchronous = NORMAL')
+    con.execute(f'PRAGMA cache_size = {-DB_CACHE_KB}')
+    con.execute(f'PRAGMA mmap_size = {DB_MMAP_BYTES}')
+    con.execute('PRAGMA temp_store = MEMORY')
     return con
 
 
-def init_db() -> None:
+def db() -> sqlite3.Connection:
+    """Trådens anslutning till DB_PATH (skapas vid behov). Ska inte stängas av anroparen."""
+    key = (os.getpid(), DB_PATH)
+    if getattr(_local, 'key', None) != key:
+        _local.con = _connect(DB_PATH)
+        _local.key = key
+        _local.depth = 0
+        _local.changed = set()
+    return _local.con
+
+
+def close_db() -> None:
+    """Stänger trådens anslutning (t.ex. när en worker-tråd avslutas)."""
+    con = getattr(_local, 'con', None)
+    if con is not None and getattr(_local, 'key', (None,))[0] == os.getpid():
+        con.close()
+    _local.con = None
+    _local.key = None
+    _local.depth = 0
+    _local.changed = set()
+
+
+@contextmanager
+def tx() -> Iterator[sqlite3.Connection]:
+    """Skrivtransaktion (BEGIN IMMEDIATE ... COMMIT / ROLLBACK).
+
+    Nästlade tx() går upp i den yttersta transaktionen. Meta-nycklar som
+    bumpats i transaktionen publiceras till prenumeranter efter COMMIT.
+    """
     con = db()
-    cur = con.cursor()
+    if _local.depth > 0:
+        _local.depth += 1
+        try:
+            yield con
+        finally:
+            _local.depth -= 1
+        return
+
+    con.execute('BEGIN IMMEDIATE')
+    _local.depth = 1
+    _local.changed = set()
+    try:
+        yield con
+    except BaseException:
+        _local.depth = 0
+        _local.changed = set()
+        con.execute('ROLLBACK')
+        raise
+    _local.depth = 0
+    con.execute('COMMIT')
+
+    changed, _local.changed = _local.changed, set()
+    if changed:
+        publish(changed)
+
+
+def init_db() -> None:
+    """Skapar/uppgraderar schemat (se MIGRATIONS). Idempotent."""
+    with tx() as con:
+        had_totals = _table_exists(con, 'item_totals')
+        version = schema_version()
+        if version > SCHEMA_VERSION:
+            raise ValueError(f'Databasen har schema {version}, koden känner bara till {SCHEMA_VERSION}')
+        for v, desc, migrate in MIGRATIONS:
+            if v > version:
+                log.info('schema migration %d: %s', v, desc)
+                migrate(con.cursor())
+                con.execute(f'PRAGMA user_version = {int(v)}')
+        if not had_totals:
+            # befintlig databas utan item_totals: bygg upp från votes
+            rebuild_item_totals()
+
+
+def schema_version() -> int:
+    """Senast körda migration (PRAGMA user_version; 0 = databas från före migrationerna)."""
+    return int(db().execute('PRAGMA user_version').fetchone()[0])
+
+
+def _table_exists(con: sqlite3.Connection, name: str) -> bool:
+    row = con.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)).fetchone()
+    return row is not None
+
+
+def _create_schema(cur: sqlite3.Cursor) -> None:
 
     cur.execute(
         """
@@ -96,7 +205,7 @@ def init_db() -> None:
         run_id TEXT NOT NULL,
         item_id INTEGER NOT NULL,
         participant_id INTEGER,
-        weight_snapshot TEXT,         -- JSON: {participant_id: weight}
+        weight_snapshot TEXT,         -- BLOB (snapshots.encode) eller äldre JSON-text
         created_at INTEGER NOT NULL,
         FOREIGN KEY (item_id) REFERENCES items(id),
         FOREIGN KEY (participant_id) REFERENCES participants(id)
@@ -123,49 +232,214 @@ def init_db() -> None:
     """
     )
 
+    # Materialiserade totalsummor per artikel, underhålls av triggers på votes/items.
+    cur.execute(
+        """
+    CREATE TABLE IF NOT EXISTS item_totals (
+        item_id INTEGER PRIMARY KEY,
+        total_points INTEGER NOT NULL DEFAULT 0,
+        voters INTEGER NOT NULL DEFAULT 0,
+        FOREIGN KEY (item_id) REFERENCES items(id)
+    );
+    """
+    )
+
+    cur.execute(
+        """
+    CREATE TRIGGER IF NOT EXISTS item_totals_vote_ins AFTER INSERT ON votes
+    BEGIN
+        INSERT OR IGNORE INTO item_totals(item_id) VALUES (NEW.item_id);
+        UPDATE item_totals
+           SET total_points = total_points + NEW.points,
+               voters = voters + (NEW.points > 0)
+         WHERE item_id = NEW.item_id;
+    END;
+    """
+    )
+
+    cur.execute(
+        """
+    CREATE TRIGGER IF NOT EXISTS item_totals_vote_del AFTER DELETE ON votes
+    BEGIN
+        UPDATE item_totals
+           SET total_points = total_points - OLD.points,
+               voters = voters - (OLD.points > 0)
+         WHERE item_id = OLD.item_id;
+    END;
+    """
+    )
+
+    cur.execute(
+        """
+    CREATE TRIGGER IF NOT EXISTS item_totals_vote_upd AFTER UPDATE OF item_id, points ON votes
+    BEGIN
+        UPDATE item_totals
+           SET total_points = total_points - OLD.points,
+               voters = voters - (OLD.points > 0)
+         WHERE item_id = OLD.item_id;
+        INSERT OR IGNORE INTO item_totals(item_id) VALUES (NEW.item_id);
+        UPDATE item_totals
+           SET total_points = total_points + NEW.points,
+               voters = voters + (NEW.points > 0)
+         WHERE item_id = NEW.item_id;
+    END;
+    """
+    )
+
+    cur.execute(
+        """
+    CREATE TRIGGER IF NOT EXISTS item_totals_item_ins AFTER INSERT ON items
+    BEGIN
+        INSERT OR IGNORE INTO item_totals(item_id) VALUES (NEW.id);
+    END;
+    """
+    )
+
+    cur.execute(
+        """
+    CREATE TRIGGER IF NOT EXISTS item_totals_item_del AFTER DELETE ON items
+    BEGIN
+        DELETE FROM item_totals WHERE item_id = OLD.id;
+    END;
+    """
+    )
+
+    # Lottningsjobb (draw_jobs.py). Progress under körning hålls i minnet;
+    # tabellen får status och slutlig progress.
+    cur.execute(
+        """
+    CREATE TABLE IF NOT EXISTS draw_jobs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        seed TEXT NOT NULL,
+        engine TEXT,
+        status TEXT NOT NULL,          -- queued/running/done/failed/cancelled
+        phase TEXT,
+        done INTEGER NOT NULL DEFAULT 0,
+        total INTEGER NOT NULL DEFAULT 0,
+        run_id TEXT,
+        error TEXT,
+        created_at INTEGER NOT NULL,
+        started_at INTEGER,
+        finished_at INTEGER
+    );
+    """
+    )
+
     # ensure version counters exist
     cur.execute("INSERT OR IGNORE INTO meta(key, value) VALUES('votes_version', 0)")
     cur.execute("INSERT OR IGNORE INTO meta(key, value) VALUES('items_version', 0)")
     cur.execute("INSERT OR IGNORE INTO meta(key, value) VALUES('alloc_version', 0)")
+    cur.execute("INSERT OR IGNORE INTO meta(key, value) VALUES('participants_version', 0)")
+    cur.execute("INSERT OR IGNORE INTO meta(key, value) VALUES('jobs_version', 0)")
+
+
+def _add_indexes(cur: sqlite3.Cursor) -> None:
+    """Sekundärindex för frågor som körs ofta eller växer med historiken (kontroll: bench.query_plans)."""
+    for sql in (
+        'CREATE INDEX IF NOT EXISTS idx_allocations_run ON allocations(run_id)',
+        'CREATE INDEX IF NOT EXISTS idx_allocations_participant ON allocations(participant_id)',
+        'CREATE INDEX IF NOT EXISTS idx_runs_created ON runs(created_at)',
+        'CREATE INDEX IF NOT EXISTS idx_votes_item ON votes(item_id)',
+        'CREATE INDEX IF NOT EXISTS idx_items_category_name ON items(category, name)',
+        'CREATE INDEX IF NOT EXISTS idx_participants_created ON participants(created_at, name)',
+    ):
+        cur.execute(sql)
+
+
+def _sparse_votes(cur: sqlite3.Cursor) -> None:
+    """Bara poäng > 0 lagras i votes; inlämnad-status flyttas till participants.submitted_at.
+
+    Tidigare sparade /vote en rad per artikel, även 0 poäng, och "inlämnad"
+    betydde "har rader i votes". submitted_at sätts för dem som har rader
+    (tiden är okänd, så created_at), sedan tas rader med 0 (eller negativa)
+    poäng bort: de positiva raderna sparas undan, votes töms utan triggrar
+    (SQLite kan då tömma tabellen direkt i stället för rad för rad) och fylls
+    igen, och item_totals byggs om. Triggrarna nedan stoppar nya rader som
+    inte är positiva.
+    """
+    cur.execute('ALTER TABLE participants ADD COLUMN submitted_at INTEGER')
+    cur.execute(
+        'UPDATE participants SET submitted_at = created_at '
+        'WHERE id IN (SELECT DISTINCT participant_id FROM votes)'
+    )
+    triggers = cur.execute("SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'votes'").fetchall()
+    cur.execute('CREATE TEMP TABLE votes_positive AS SELECT participant_id, item_id, points FROM votes WHERE points > 0')
+    for name, _sql in triggers:
+        cur.execute(f'DROP TRIGGER "{name}"')
+    cur.execute('DELETE FROM votes')
+    cur.execute('INSERT INTO votes(participant_id, item_id, points) SELECT participant_id, item_id, points FROM votes_positive')
+    cur.execute('DROP TABLE votes_positive')
+    for _name, sql in triggers:
+        cur.execute(sql)
+    cur.execute('DELETE FROM item_totals')
+    cur.execute(f'INSERT INTO item_totals(item_id, total_points, voters) {_ITEM_TOTALS_FROM_VOTES}')
+    cur.execute(
+        """
+    CREATE TRIGGER IF NOT EXISTS votes_positive_ins BEFORE INSERT ON votes
+    WHEN NEW.points <= 0
+    BEGIN
+        SELECT RAISE(ABORT, 'votes.points måste vara > 0');
+    END;
+    """
+    )
+    cur.execute(
+        """
+    CREATE TRIGGER IF NOT EXISTS votes_positive_upd BEFORE UPDATE OF points ON votes
+    WHEN NEW.points <= 0
+    BEGIN
+        SELECT RAISE(ABORT, 'votes.points måste vara > 0');
+    END;
+    """
+    )
+
 
-    con.commit()
-    con.close()
+# Schemamigrationer: (version, beskrivning, funktion), körs i ordning av init_db
+# och version sparas i PRAGMA user_version i samma transaktion. Version 1 är
+# grundschemat (CREATE ... IF NOT EXISTS, så det fungerar även på databaser
+# från före migrationerna). Lägg nya ändringar sist; ändra aldrig en migration
+# som redan kan ha körts.
+MIGRATIONS: List[Tuple[int, str, Callable[[sqlite3.Cursor], None]]] = [
+    (1, 'grundschema', _create_schema),
+    (2, 'sekundärindex', _add_indexes),
+    (3, 'glesa röster', _sparse_votes),
+]
+SCHEMA_VERSION = MIGRATIONS[-1][0]
 
 
 def q_all(sql: str, params: Tuple = ()) -> List[sqlite3.Row]:
-    con = db()
-    rows = con.execute(sql, params).fetchall()
-    con.close()
+    if not metrics.ENABLED:
+        return db().execute(sql, params).fetchall()
+    t0 = time.perf_counter()
+    rows = db().execute(sql, params).fetchall()
+    metrics.observe('query', metrics.query_name(sql), time.perf_counter() - t0, len(rows))
     return rows
 
 
 def q_one(sql: str, params: Tuple = ()) -> Optional[sqlite3.Row]:
-    con = db()
-    row = con.execute(sql, params).fetchone()
-    con.close()
+    if not metrics.ENABLED:
+        return db().execute(sql, params).fetchone()
+    t0 = time.perf_counter()
+    row = db().execute(sql, params).fetchone()
+    metrics.observe('query', metrics.query_name(sql), time.perf_counter() - t0, int(row is not None))
     return row
 
 
 def exec_sql(sql: str, params: Tuple = ()) -> None:
-    con = db()
-    con.execute(sql, params)
-    con.commit()
-    con.close()
+    with metrics.timed_query(sql):
+        with tx() as con:
+            con.execute(sql, params)
 
 
 def exec_many(sql: str, params_list: List[Tuple]) -> None:
-    con = db()
-    con.executemany(sql, params_list)
-    con.commit()
-    con.close()
+    with metrics.timed_query(sql) as m:
+        with tx() as con:
+            m.rows = con.executemany(sql, params_list).rowcount
 
 
 def bump_meta(key: str) -> None:
-    con = db()
-    cur = con.cursor()
-    cur.execute("UPDATE meta SET value = value + 1 WHERE key = ?", (key,))
-    con.commit()
-    con.close()
+    with tx() as con:
+        con.execute("UPDATE meta SET value = value + 1 WHERE key = ?", (key,))
+        _local.changed.add(key)
 
 
 def get_meta(key: str) -> int:
@@ -173,6 +447,156 @@ def get_meta(key: str) -> int:
     return int(row['value']) if row else 0
 
 
+def get_meta_many(keys: Tuple[str, ...]) -> Tuple[int, ...]:
+    """Flera meta-värden i en fråga, i samma ordning som keys (saknade = 0)."""
+    marks = ', '.join('?' for _ in keys)
+    rows = q_all(f'SELECT key, value FROM meta WHERE key IN ({marks})', keys)
+    by_key = {str(r['key']): int(r['value']) for r in rows}
+    return tuple(by_key.get(k, 0) for k in keys)
+
+
+# ---------------- Versioned cache ----------------
+#
+# Processgemensam cache för tunga läsfrågor. Varje post gäller för en viss
+# kombination av meta-versioner; bump_meta() ogiltigförklarar alltså posten
+# och en läsning kostar bara en meta-fråga tills nästa ändring.
+
+_cache_lock = threading.Lock()
+_cache: Dict[str, Tuple[Tuple[Any, ...], Any]] = {}
+
+
+def cached_by_versions(name: str, version_keys: Tuple[str, ...], load: Callable[[], Any]) -> Any:
+    """Returnerar load() från cache så länge meta-versionerna i version_keys är oförändrade.
+
+    Värdet delas mellan alla anropare och ska inte ändras.
+    """
+    stamp = (DB_PATH,) + get_meta_many(version_keys)
+    with _cache_lock:
+        hit = _cache.get(name)
+    if hit is not None and hit[0] == stamp:
+        if metrics.ENABLED:
+            metrics.inc('cache', f'{name}:hit')
+        return hit[1]
+    if metrics.ENABLED:
+        metrics.inc('cache', f'{name}:miss')
+
+    # Versionerna läses före datat, så värdet är minst lika färskt som stamp.
+    value = load()
+    with _cache_lock:
+        _cache[name] = (stamp, value)
+    return value
+
+
+def clear_cache() -> None:
+    with _cache_lock:
+        _cache.clear()
+
+
+# ---------------- Change notifications ----------------
+#
+# Pub/sub inom processen. Ämnena är meta-nycklarna (votes_version,
+# items_version, alloc_version, participants_version) och publiceras av tx()
+# när en transaktion som bumpat dem har committats. Prenumeranter som skapats
+# inne i en asyncio-loop (NiceGUI-sidor) anropas i den loopen, oavsett vilken
+# tråd ändringen gjordes i.
+
+class Subscription:
+    def __init__(
+        self,
+        topics: FrozenSet[str],
+        callback: Callable[[FrozenSet[str]], None],
+        alive: Optional[Callable[[], bool]],
+        min_interval: float,
+        loop: Optional[asyncio.AbstractEventLoop],
+    ) -> None:
+        self.topics = topics
+        self.callback = callback
+        self.alive = alive
+        self.min_interval = min_interval
+        self.loop = loop
+        self._lock = threading.Lock()
+        self._pending: Set[str] = set()
+        self._scheduled = False
+        self._last = 0.0
+
+    def close(self) -> None:
+        with _subs_lock:
+            if self in _subs:
+                _subs.remove(self)
+
+    def _notify(self, topics: Set[str]) -> None:
+        with self._lock:
+            self._pending |= topics
+            if self._scheduled:
+                return
+            self._scheduled = True
+
+        if self.loop is None:
+            self._deliver()
+            return
+        try:
+            self.loop.call_soon_threadsafe(self._schedule)
+        except RuntimeError:  # loopen är stängd
+            self.close()
+
+    def _schedule(self) -> None:
+        # Körs i loopen; samlar ihop ändringar som kommer tätare än min_interval
+        delay = self.min_interval - (time.monotonic() - self._last)
+        if delay > 0:
+            self.loop.call_later(delay, self._deliver)
+        else:
+            self._deliver()
+
+    def _deliver(self) -> None:
+        with self._lock:
+            topics = frozenset(self._pending)
+            self._pending.clear()
+            self._scheduled = False
+
+        if self.alive is not None and not self.alive():
+            self.close()
+            return
+
+        self._last = time.monotonic()
+        try:
+            self.callback(topics)
+        except Exception:
+            log.exception('change subscriber failed')
+
+
+_subs_lock = threading.Lock()
+_subs: List[Subscription] = []
+
+
+def subscribe(
+    topics: Iterable[str],
+    callback: Callable[[FrozenSet[str]], None],
+    alive: Optional[Callable[[], bool]] = None,
+    min_interval: float = 0.0,
+) -> Subscription:
+    """Anropar callback(ändrade ämnen) när något av topics publiceras.
+
+    alive: kontrolleras före varje leverans; False avslutar prenumerationen.
+    min_interval: minsta tid (s) mellan två anrop, tätare ändringar slås ihop.
+    """
+    try:
+        loop: Optional[asyncio.AbstractEventLoop] = asyncio.get_running_loop()
+    except RuntimeError:
+        loop = None
+    sub = Subscription(frozenset(topics), callback, alive, min_interval, loop)
+    with _subs_lock:
+        _subs.append(sub)
+    return sub
+
+
+def publish(topics: Iterable[str]) -> None:
+    topics = set(topics)
+    with _subs_lock:
+        targets = [s for s in _subs if s.topics & topics]
+    for sub in targets:
+        sub._notify(sub.topics & topics)
+
+
 # ---------------- Participants ----------------
 
 def get_or_create_participant(name: str) -> int:
@@ -182,15 +606,13 @@ def get_or_create_participant(name: str) -> int:
     row = q_one('SELECT id FROM participants WHERE name = ?', (name,))
     if row:
         return int(row['id'])
-    con = db()
-    cur = con.cursor()
-    cur.execute(
-        'INSERT INTO participants(name, created_at) VALUES(?, ?)',
-        (name, int(time.time())),
-    )
-    con.commit()
-    pid = int(cur.lastrowid)
-    con.close()
+    with tx() as con:
+        cur = con.execute(
+            'INSERT INTO participants(name, created_at) VALUES(?, ?)',
+            (name, int(time.time())),
+        )
+        pid = int(cur.lastrowid)
+        bump_meta('participants_version')
     return pid
 
 
@@ -200,15 +622,14 @@ def list_participants() -> List[sqlite3.Row]:
 
 def delete_participant(pid: int) -> None:
     """Tar bort en deltagare och allt kopplat (rster + ev. vinster i resultat)."""
-    con = db()
-    cur = con.cursor()
-    cur.execute('DELETE FROM votes WHERE participant_id = ?', (pid,))
-    cur.execute('DELETE FROM allocations WHERE participant_id = ?', (pid,))
-    cur.execute('DELETE FROM participants WHERE id = ?', (pid,))
-    con.commit()
-    con.close()
-    bump_meta('votes_version')
-    bump_meta('alloc_version')
+    with tx() as con:
+        cur = con.cursor()
+        cur.execute('DELETE FROM votes WHERE participant_id = ?', (pid,))
+        cur.execute('DELETE FROM allocations WHERE participant_id = ?', (pid,))
+        cur.execute('DELETE FROM participants WHERE id = ?', (pid,))
+        bump_meta('participants_version')
+        bump_meta('votes_version')
+        bump_meta('alloc_version')
 
 
 # ---------------- Items ----------------
@@ -218,30 +639,101 @@ def list_items() -> List[sqlite3.Row]:
 
 
 def list_items_with_point_totals() -> List[sqlite3.Row]:
-    """Returnerar alla artiklar med totalpoäng (summa av alla deltagares poäng per artikel)."""
+    """Returnerar alla artiklar med totalpoäng (summa av alla deltagares poäng per artikel).
+
+    Cachas per (items_version, votes_version).
+    """
+    return cached_by_versions(
+        'items_with_point_totals',
+        ('items_version', 'votes_version'),
+        _load_items_with_point_totals,
+    )
+
+
+def _load_items_with_point_totals() -> List[sqlite3.Row]:
     return q_all(
         """
         SELECT i.id, i.name, i.category, i.quantity,
-               COALESCE(SUM(v.points), 0) AS total_points,
-               COALESCE(SUM(CASE WHEN v.points > 0 THEN 1 ELSE 0 END), 0) AS voters
+               COALESCE(t.total_points, 0) AS total_points,
+               COALESCE(t.voters, 0) AS voters
         FROM items i
-        LEFT JOIN votes v ON v.item_id = i.id
-        GROUP BY i.id, i.name, i.category, i.quantity
-        ORDER BY (COALESCE(SUM(v.points), 0)) DESC, i.category, i.name
+        LEFT JOIN item_totals t ON t.item_id = i.id
+        ORDER BY COALESCE(t.total_points, 0) DESC, i.category, i.name
+        """
+    )
+
+
+# Samma aggregat som item_totals ska innehålla, beräknat direkt från votes.
+_ITEM_TOTALS_FROM_VOTES = """
+    SELECT i.id AS item_id,
+           COALESCE(SUM(v.points), 0) AS total_points,
+           COUNT(v.item_id) AS voters
+    FROM items i
+    LEFT JOIN votes v ON v.item_id = i.id
+    GROUP BY i.id
+"""
+
+
+def rebuild_item_totals() -> None:
+    """Bygger om item_totals från votes (i en transaktion)."""
+    with tx() as con:
+        con.execute('DELETE FROM item_totals')
+        con.execute(f'INSERT INTO item_totals(item_id, total_points, voters) {_ITEM_TOTALS_FROM_VOTES}')
+        bump_meta('votes_version')
+
+
+def check_item_totals(repair: bool = False) -> List[int]:
+    """Jämför item_totals mot ett fullt aggregat av votes.
+
+    Returnerar id för artiklar som avviker (tom lista = konsistent).
+    Med repair=True byggs tabellen om när avvikelser hittas.
+    """
+    rows = q_all(
+        f"""
+        SELECT item_id FROM (
+            SELECT item_id, total_points, voters FROM ({_ITEM_TOTALS_FROM_VOTES})
+            EXCEPT
+            SELECT t.item_id, t.total_points, t.voters FROM item_totals t JOIN items i ON i.id = t.item_id
+        )
+        UNION
+        SELECT item_id FROM (
+            SELECT t.item_id, t.total_points, t.voters FROM item_totals t
+            EXCEPT
+            SELECT item_id, total_points, voters FROM ({_ITEM_TOTALS_FROM_VOTES})
+        )
+        ORDER BY item_id
         """
     )
+    bad = [int(r['item_id']) for r in rows]
+    if bad and repair:
+        rebuild_item_totals()
+    return bad
+
+
+ITEMS_CHUNK_ROWS = int(os.environ.get('ITEMS_CHUNK_ROWS', '50000'))  # rader per block vid strömmande import
+
+ProgressFn = Callable[[int, Optional[float]], None]  # (rader hittills, andel av filen eller None)
+
+# Cellerna läses som text och tolkas i _normalize_items. Annars gissar pandas
+# typ per fil eller per block, och namnet 7 blir '7.0' i ett block med en tom
+# cell men '7' i ett annat. Tomma celler blir '', och texten 'NA' är ett namn.
+_READ_OPTS: Dict[str, Any] = {'dtype': str, 'keep_default_na': False}
 
 
 def parse_items_file(content: bytes, filename: str) -> pd.DataFrame:
     """Lser .xlsx/.xls/.csv till DataFrame med kolumner: name, category, quantity."""
     fn = filename.lower()
     if fn.endswith('.xlsx') or fn.endswith('.xls'):
-        df = pd.read_excel(io.BytesIO(content))
+        df = pd.read_excel(io.BytesIO(content), **_READ_OPTS)
     elif fn.endswith('.csv'):
-        df = pd.read_csv(io.BytesIO(content))
+        df = pd.read_csv(io.BytesIO(content), **_READ_OPTS)
     else:
         raise ValueError('Stder bara .xlsx/.xls/.csv')
+    return _normalize_items(df)
+
 
+def _normalize_items(df: pd.DataFrame) -> pd.DataFrame:
+    """Kolumnnamn, standardvärden och städning; samma för hel fil och för varje block."""
     df.columns = [str(c).strip().lower() for c in df.columns]
     if 'name' not in df.columns:
         raise ValueError('Kolumnen "name" saknas i filen')
@@ -252,7 +744,7 @@ def parse_items_file(content: bytes, filename: str) -> pd.DataFrame:
         df['quantity'] = 1
 
     df = df[['name', 'category', 'quantity']].copy()
-    df['name'] = df['name'].astype(str).str.strip()
+    df['name'] = df['name'].fillna('').astype(str).str.strip()  # tom cell = tomt namn, inte 'nan'
     df['category'] = df['category'].fillna('').astype(str).str.strip()
     df['quantity'] = pd.to_numeric(df['quantity'], errors='coerce').fillna(1).astype(int)
 
@@ -261,6 +753,181 @@ def parse_items_file(content: bytes, filename: str) -> pd.DataFrame:
     return df
 
 
+@dataclass
+class ImportResult:
+    rows: int
+    seconds: float
+
+    @property
+    def rows_per_sec(self) -> float:
+        return self.rows / self.seconds if self.seconds > 0 else float('inf')
+
+
+def _insert_items(con: sqlite3.Connection, df: pd.DataFrame) -> int:
+    # Parametrar från hela kolumner (inte iterrows), det avgör tiden för stora kataloger
+    n = len(df)
+    names = df['name'].astype(str).tolist()
+    categories = df['category'].astype(str).tolist() if 'category' in df.columns else [''] * n
+    quantities = df['quantity'].astype(int).tolist() if 'quantity' in df.columns else [1] * n
+    con.executemany(
+        'INSERT INTO items(name, category, quantity) VALUES(?, ?, ?)',
+        zip(names, categories, quantities),
+    )
+    return n
+
+
+def import_items(df: pd.DataFrame) -> ImportResult:
+    """Ersätter alla artiklar med df (från parse_items_file).
+
+    Rensning av artiklar/röster/resultat och insert sker i samma transaktion, så
+    items_version aldrig pekar på en tom lista.
+    """
+    t0 = time.perf_counter()
+    with tx() as con:
+        clear_items_and_votes_and_allocations()
+        n = _insert_items(con, df)
+
+    result = ImportResult(rows=n, seconds=time.perf_counter() - t0)
+    log.info('import_items: %d rader på %.2f s (%.0f rader/s)', n, result.seconds, result.rows_per_sec)
+    return result
+
+
+def import_items_file(
+    source: Union[str, IO[bytes]],
+    filename: str,
+    chunk_rows: Optional[int] = None,
+    progress: Optional[ProgressFn] = None,
+) -> ImportResult:
+    """Importerar en uppladdad fil (sökväg eller binär fil) med bästa vägen för formatet.
+
+    .csv och .xlsx strömmas (import_items_csv / import_items_xlsx); övriga
+    format går via parse_items_file + import_items.
+    """
+    fn = filename.lower()
+    if fn.endswith('.csv'):
+        return import_items_csv(source, chunk_rows, progress)
+    if fn.endswith('.xlsx'):
+        return import_items_xlsx(source, chunk_rows, progress)
+
+    if isinstance(source, str):
+        with open(source, 'rb') as f:
+            content = f.read()
+    else:
+        content = source.read()
+    result = import_items(parse_items_file(content, filename))
+    if progress is not None:
+        progress(result.rows, 1.0)
+    return result
+
+
+def import_items_csv(
+    source: Union[str, IO[bytes]],
+    chunk_rows: Optional[int] = None,
+    progress: Optional[ProgressFn] = None,
+) -> ImportResult:
+    """Strömmande import av en .csv (sökväg eller binär fil) utan att hela filen läses in.
+
+    Filen läses i block om chunk_rows rader (standard ITEMS_CHUNK_ROWS), varje
+    block normaliseras som i parse_items_file och skrivs direkt. Minnet begränsas
+    alltså av blockstorleken. Allt sker i en transaktion: ett fel i filen
+    lämnar de gamla artiklarna orörda.
+
+    progress(rader, andel) anropas efter varje block; andel är None om filens
+    storlek inte går att avgöra.
+    """
+    f = open(source, 'rb') if isinstance(source, str) else source
+    try:
+        size = _stream_size(f)
+        chunks = (
+            (chunk, min(f.tell() / size, 1.0) if size else None)
+            for chunk in pd.read_csv(f, chunksize=chunk_rows or ITEMS_CHUNK_ROWS, **_READ_OPTS)
+        )
+        return _import_chunks('import_items_csv', chunks, progress)
+    finally:
+        if isinstance(source, str):
+            f.close()
+
+
+def import_items_xlsx(
+    source: Union[str, IO[bytes]],
+    chunk_rows: Optional[int] = None,
+    progress: Optional[ProgressFn] = None,
+) -> ImportResult:
+    """Strömmande import av en .xlsx via openpyxl read-only (ingen DOM för hela arbetsboken).
+
+    Läser första bladet som pd.read_excel. Första raden är rubriker; kolumnerna
+    name/category/quantity hittas oavsett ordning, versaler och mellanslag, övriga
+    kolumner läses aldrig in i DataFrames. I övrigt som import_items_csv.
+    """
+    from openpyxl import load_workbook
+
+    wb = load_workbook(source, read_only=True, data_only=True)
+    try:
+        chunks = _xlsx_chunks(wb.worksheets[0], chunk_rows or ITEMS_CHUNK_ROWS)
+        return _import_chunks('import_items_xlsx', chunks, progress)
+    finally:
+        wb.close()
+
+
+def _xlsx_chunks(ws: Any, chunk_rows: int) -> Iterator[Tuple[pd.DataFrame, Optional[float]]]:
+    header = next(ws.iter_rows(max_row=1, values_only=True), ())
+    cols: Dict[str, int] = {}
+    for k, h in enumerate(header):
+        key = str(h).strip().lower() if h is not None else ''
+        if key in ('name', 'category', 'quantity') and key not in cols:
+            cols[key] = k
+    if 'name' not in cols:
+        raise ValueError('Kolumnen "name" saknas i filen')
+
+    keys = list(cols)
+    idx = [cols[k] for k in keys]
+    width = max(idx) + 1
+    total = (ws.max_row or 0) - 1  # dimensionen i filen; saknas ibland
+    done = 0
+    buf: List[Tuple] = []
+    # Kolumner till höger om de vi behöver tolkas inte alls
+    for row in ws.iter_rows(min_row=2, max_col=width, values_only=True):
+        if len(row) < width:
+            row = tuple(row) + (None,) * (width - len(row))
+        buf.append(tuple(row[i] for i in idx))
+        if len(buf) >= chunk_rows:
+            done += len(buf)
+            yield pd.DataFrame(buf, columns=keys, dtype=object), (min(done / total, 1.0) if total > 0 else None)
+            buf = []
+    if buf:
+        yield pd.DataFrame(buf, columns=keys, dtype=object), 1.0
+
+
+def _import_chunks(
+    label: str,
+    chunks: Iterable[Tuple[pd.DataFrame, Optional[float]]],
+    progress: Optional[ProgressFn],
+) -> ImportResult:
+    """Rensar och skriver block för block i en transaktion."""
+    t0 = time.perf_counter()
+    n = 0
+    with tx() as con:
+        clear_items_and_votes_and_allocations()
+        for chunk, fraction in chunks:
+            n += _insert_items(con, _normalize_items(chunk))
+            if progress is not None:
+                progress(n, fraction)
+
+    result = ImportResult(rows=n, seconds=time.perf_counter() - t0)
+    log.info('%s: %d rader på %.2f s (%.0f rader/s)', label, n, result.seconds, result.rows_per_sec)
+    return result
+
+
+def _stream_size(f: IO[bytes]) -> Optional[int]:
+    try:
+        pos = f.tell()
+        size = f.seek(0, io.SEEK_END)
+        f.seek(pos)
+        return size - pos
+    except (AttributeError, OSError, ValueError):
+        return None
+
+
 # ---------------- Votes ----------------
 
 def get_votes_for_participant(pid: int) -> Dict[int, int]:
@@ -282,14 +949,45 @@ def get_votes_detailed(pid: int) -> List[sqlite3.Row]:
 
 
 def upsert_votes(pid: int, votes: Dict[int, int]) -> None:
-    params = [(pid, int(item_id), int(points)) for item_id, points in votes.items()]
-    con = db()
-    cur = con.cursor()
-    cur.execute('DELETE FROM votes WHERE participant_id = ?', (pid,))
-    cur.executemany('INSERT INTO votes(participant_id, item_id, points) VALUES(?, ?, ?)', params)
-    con.commit()
-    con.close()
-    bump_meta('votes_version')
+    """Sparar deltagarens röster; artiklar som saknas eller har 0 poäng tas bort.
+
+    Bara poäng > 0 lagras (votes har inga nollrader), och bara rader som
+    skiljer sig från de sparade skrivs. Deltagaren räknas som inlämnad
+    (submitted_at) om votes inte är tom, som formuläret på /vote. Jämförelse,
+    skrivningar och versioner i samma transaktion; versionerna bumpas bara om
+    något ändrades.
+    """
+    wanted = {int(item_id): int(points) for item_id, points in votes.items() if int(points) > 0}
+    with tx() as con:
+        stored = {
+            int(r['item_id']): int(r['points'])
+            for r in con.execute('SELECT item_id, points FROM votes WHERE participant_id = ?', (pid,))
+        }
+        removed = [(pid, iid) for iid in stored if iid not in wanted]
+        changed = [(pts, pid, iid) for iid, pts in wanted.items() if iid in stored and stored[iid] != pts]
+        added = [(pid, iid, pts) for iid, pts in wanted.items() if iid not in stored]
+
+        if removed:
+            con.executemany('DELETE FROM votes WHERE participant_id = ? AND item_id = ?', removed)
+        if changed:
+            con.executemany('UPDATE votes SET points = ? WHERE participant_id = ? AND item_id = ?', changed)
+        if added:
+            con.executemany('INSERT INTO votes(participant_id, item_id, points) VALUES(?, ?, ?)', added)
+        if removed or changed or added:
+            bump_meta('votes_version')
+
+        if votes:
+            cur = con.execute(
+                'UPDATE participants SET submitted_at = ? WHERE id = ? AND submitted_at IS NULL',
+                (int(time.time()), pid),
+            )
+        else:
+            cur = con.execute(
+                'UPDATE participants SET submitted_at = NULL WHERE id = ? AND submitted_at IS NOT NULL',
+                (pid,),
+            )
+        if cur.rowcount:
+            bump_meta('participants_version')
 
 
 def vote_sum_for_participant(pid: int) -> int:
@@ -301,34 +999,108 @@ def vote_sum_for_participant(pid: int) -> int:
 
 
 def participant_has_submitted(pid: int) -> bool:
-    row = q_one('SELECT COUNT(*) AS c FROM votes WHERE participant_id = ?', (pid,))
-    return int(row['c']) > 0 or POINT_BUDGET == 0
+    row = q_one('SELECT submitted_at FROM participants WHERE id = ?', (pid,))
+    return (row is not None and row['submitted_at'] is not None) or POINT_BUDGET == 0
+
+
+def list_participants_with_vote_summary() -> List[sqlite3.Row]:
+    """Alla deltagare (list_participants-ordning) med vote_sum, vote_count och submitted.
+
+    vote_count är antal artiklar med poäng; submitted följer
+    participant_has_submitted. En grupperad fråga, cachad per
+    (participants_version, votes_version).
+    """
+    return cached_by_versions(
+        'participants_with_vote_summary',
+        ('participants_version', 'votes_version'),
+        _load_participants_with_vote_summary,
+    )
+
+
+def _load_participants_with_vote_summary() -> List[sqlite3.Row]:
+    return q_all(
+        """
+        SELECT p.id, p.name, p.created_at,
+               COALESCE(SUM(v.points), 0) AS vote_sum,
+               COUNT(v.item_id) AS vote_count,
+               (p.submitted_at IS NOT NULL OR ? = 0) AS submitted
+        FROM participants p
+        LEFT JOIN votes v ON v.participant_id = p.id
+        GROUP BY p.id, p.name, p.created_at, p.submitted_at
+        ORDER BY p.created_at, p.name
+        """,
+        (POINT_BUDGET,),
+    )
 
 
 # ---------------- Clears ----------------
 
 def clear_items_and_votes_and_allocations() -> None:
-    con = db()
-    cur = con.cursor()
-    cur.execute('DELETE FROM allocations')
-    cur.execute('DELETE FROM runs')
-    cur.execute('DELETE FROM votes')
-    cur.execute('DELETE FROM items')
-    con.commit()
-    con.close()
-    bump_meta('items_version')
-    bump_meta('votes_version')
-    bump_meta('alloc_version')
+    with tx() as con:
+        cur = con.cursor()
+        cur.execute('DELETE FROM allocations')
+        cur.execute('DELETE FROM runs')
+        cur.execute('DELETE FROM votes')
+        cur.execute('DELETE FROM items')
+        cur.execute('UPDATE participants SET submitted_at = NULL')
+        bump_meta('items_version')
+        bump_meta('votes_version')
+        bump_meta('participants_version')
+        bump_meta('alloc_version')
 
 
 def clear_allocations() -> None:
+    """Tar bort alla dragningar (hela historiken)."""
+    with tx() as con:
+        cur = con.cursor()
+        cur.execute('DELETE FROM allocations')
+        cur.execute('DELETE FROM runs')
+        bump_meta('alloc_version')
+
+
+RUNS_KEEP = int(os.environ.get('RUNS_KEEP', '20'))  # antal dragningar som sparas, 0 = alla
+
+
+def prune_runs(keep: Optional[int] = None) -> int:
+    """Tar bort alla utom de keep senaste dragningarna (standard RUNS_KEEP). Returnerar antal borttagna."""
+    keep = RUNS_KEEP if keep is None else keep
+    if keep <= 0:
+        return 0
+    with tx() as con:
+        old = [
+            (r['id'],) for r in con.execute(
+                'SELECT id FROM runs ORDER BY created_at DESC, rowid DESC LIMIT -1 OFFSET ?', (keep,)
+            )
+        ]
+        if not old:
+            return 0
+        con.executemany('DELETE FROM allocations WHERE run_id = ?', old)
+        con.executemany('DELETE FROM runs WHERE id = ?', old)
+        bump_meta('alloc_version')
+    return len(old)
+
+
+def compact_db(keep: Optional[int] = None, vacuum: bool = False) -> Dict[str, int]:
+    """Gallrar gamla dragningar och krymper databasfilen.
+
+    vacuum=True skriver om hela filen (VACUUM) och låser databasen under tiden;
+    annars checkpointas bara WAL-filen så att den inte växer.
+    """
+    before = _db_file_bytes()
+    pruned = prune_runs(keep)
     con = db()
-    cur = con.cursor()
-    cur.execute('DELETE FROM allocations')
-    cur.execute('DELETE FROM runs')
-    con.commit()
-    con.close()
-    bump_meta('alloc_version')
+    if vacuum:
+        con.execute('VACUUM')
+    # efter VACUUM, som skriver hela den nya filen via WAL
+    con.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+    con.execute('PRAGMA optimize')
+    return {'pruned_runs': pruned, 'bytes_before': before, 'bytes_after': _db_file_bytes()}
+
+
+def _db_file_bytes() -> int:
+    return sum(
+        os.path.getsize(p) for p in (DB_PATH, DB_PATH + '-wal') if os.path.exists(p)
+    )
 
 
 # ---------------- Draw / results ----------------
@@ -337,15 +1109,16 @@ def clear_allocations() -> None:
 class DrawResult:
     run_id: str
     seed: str
+    # sekunder per steg: load, phase_a, phase_b, persist
+    timings: Dict[str, float] = field(default_factory=dict)
 
 
 def compute_item_competition_scores() -> Dict[int, int]:
     rows = q_all(
         """
-        SELECT i.id AS item_id, COALESCE(SUM(v.points), 0) AS s
+        SELECT i.id AS item_id, COALESCE(t.total_points, 0) AS s
         FROM items i
-        LEFT JOIN votes v ON v.item_id = i.id
-        GROUP BY i.id
+        LEFT JOIN item_totals t ON t.item_id = i.id
         """
     )
     return {int(r['item_id']): int(r['s']) for r in rows}
@@ -364,8 +1137,152 @@ def weighted_choice(rng: random.Random, weights: Dict[int, float]) -> int:
     return next(iter(weights.keys()))
 
 
-def run_draw(seed: str) -> DrawResult:
-    """Tv8-algoritm:
+@dataclass
+class DrawInput:
+    """Allt en lottning behöver, oberoende av motor."""
+    item_ids: List[int]                      # list_items()-ordning
+    item_names: Dict[int, str]
+    quantities: Dict[int, int]               # >= 1
+    participant_ids: List[int]               # list_participants()-ordning
+    # item_id -> [(pid, points)], bara points > 0, deltagare i participant_ids-ordning
+    voters_by_item: Dict[int, List[Tuple[int, int]]]
+    comp: Dict[int, int]                     # totalpoäng per artikel (ordning i fas B)
+    _by_p: Optional[Dict[int, List[Tuple[int, int]]]] = field(default=None, init=False, repr=False, compare=False)
+
+    def votes_in_item_order(self) -> Dict[int, List[Tuple[int, int]]]:
+        """pid -> [(item_id, points)] i item_ids-ordning (fas A). Byggs en gång; får inte ändras."""
+        if self._by_p is None:
+            by_p: Dict[int, List[Tuple[int, int]]] = {pid: [] for pid in self.participant_ids}
+            for iid in self.item_ids:
+                for pid, pts in self.voters_by_item.get(iid, ()):
+                    by_p[pid].append((iid, pts))
+            self._by_p = by_p
+        return self._by_p
+
+
+# (item_id, participant_id eller None, snapshot som JSON-bar dict)
+Allocation = Tuple[int, Optional[int], Dict[str, Any]]
+
+DRAW_ENGINES = ('python', 'numpy')
+DRAW_ENGINE = os.environ.get('DRAW_ENGINE', 'python')
+# tv8: fas A + fas B, restartiklar till dem med lägst wins (standard)
+# classic: som oldcore.core före tv8, bara fas B och restartiklar utan vinnare
+DRAW_ALGORITHMS = ('tv8', 'classic')
+DRAW_ALGORITHM = os.environ.get('DRAW_ALGORITHM', 'tv8')
+SNAPSHOT_FORMAT = os.environ.get('SNAPSHOT_FORMAT', 'binary')  # 'binary' eller 'json'
+DRAW_BATCH_SIZE = int(os.environ.get('DRAW_BATCH_SIZE', '1000'))  # allokeringar per executemany
+DRAW_PROGRESS_STEPS = 100  # ungefär så många progress-anrop per fas
+
+DrawProgressFn = Callable[[str, int, int], None]  # (fas 'A'/'B', klara, totalt)
+
+
+def load_draw_input() -> DrawInput:
+    items = list_items()
+    participants = list_participants()
+    if not items:
+        raise ValueError('Inga artiklar inlagda')
+    if not participants:
+        raise ValueError('Inga deltagare registrerade')
+
+    # Inverterat index: en fråga som strömmas rad för rad (inga sqlite3.Row, ingen fetchall),
+    # röstande per artikel i list_participants()-ordning
+    item_set = {int(it['id']) for it in items}
+    voters_by_item: Dict[int, List[Tuple[int, int]]] = {}
+    cur = db().cursor()
+    cur.row_factory = None
+    cur.execute(
+        """
+        SELECT v.item_id, v.participant_id, v.points
+        FROM votes v
+        JOIN participants p ON p.id = v.participant_id
+        WHERE v.points > 0
+        ORDER BY v.item_id, p.created_at, p.name
+        """
+    )
+    voters: List[Tuple[int, int]] = []
+    last_iid = None
+    for iid, pid, pts in cur:
+        if iid != last_iid:
+            last_iid = iid
+            voters = voters_by_item.setdefault(iid, []) if iid in item_set else []
+        voters.append((pid, pts))
+    cur.close()
+
+    quantities: Dict[int, int] = {}
+    for it in items:
+        qty = int(it['quantity']) if it['quantity'] is not None else 1
+        quantities[int(it['id'])] = max(1, qty)
+
+    return DrawInput(
+        item_ids=[int(it['id']) for it in items],
+        item_names={int(it['id']): str(it['name']) for it in items},
+        quantities=quantities,
+        participant_ids=[int(p['id']) for p in participants],
+        voters_by_item=voters_by_item,
+        comp=compute_item_competition_scores(),
+    )
+
+
+def phase_b_units(data: DrawInput, remaining_qty: Dict[int, int]) -> List[int]:
+    """Kvarvarande units i fas B-ordning: mest "konkurrens" först (hög totalpoäng), sedan namn."""
+    units: List[int] = []
+    for iid, q in remaining_qty.items():
+        if q > 0:
+            units.extend([iid] * q)
+    units.sort(
+        key=lambda iid: (data.comp.get(int(iid), 0), data.item_names.get(int(iid), '').lower()),
+        reverse=True,
+    )
+    return units
+
+
+def allocate(
+    data: DrawInput,
+    seed: str,
+    engine: Optional[str] = None,
+    timings: Optional[Dict[str, float]] = None,
+    progress: Optional[DrawProgressFn] = None,
+    algorithm: Optional[str] = None,
+) -> Iterator[Allocation]:
+    """Kör lottningen i minnet och ger allokeringarna en i taget (ingen lista byggs upp).
+
+    Båda motorerna ger identiskt resultat för samma seed.
+
+    algorithm (standard DRAW_ALGORITHM): 'tv8' eller 'classic'. classic hoppar
+    över fas A och lämnar units som ingen röstat på utan vinnare; för samma
+    seed blir fördelningen densamma som i oldcore.core.run_draw.
+
+    timings: fylls i med sekunder för phase_a och phase_b. Tid som konsumenten
+    lägger under timings['persist'] medan motorn väntar räknas inte in i faserna.
+    progress('A', k, N) / progress('B', k, M): k av N deltagare i fas A och
+    k av M units i fas B, ungefär DRAW_PROGRESS_STEPS gånger per fas.
+    """
+    engine = engine or DRAW_ENGINE
+    if engine not in DRAW_ENGINES:
+        raise ValueError(f'Okänd lottningsmotor: {engine}')
+    algorithm = algorithm or DRAW_ALGORITHM
+    if algorithm not in DRAW_ALGORITHMS:
+        raise ValueError(f'Okänd lottningsalgoritm: {algorithm}')
+    rng = random.Random(seed)
+    timings = {} if timings is None else timings
+    if engine == 'numpy':
+        import draw_numpy
+        return draw_numpy.allocate(data, rng, timings, progress, algorithm)
+    return _allocate_python(data, rng, timings, progress, algorithm)
+
+
+def progress_step(total: int) -> int:
+    return max(1, total // DRAW_PROGRESS_STEPS)
+
+
+def _allocate_python(
+    data: DrawInput,
+    rng: random.Random,
+    timings: Dict[str, float],
+    progress: Optional[DrawProgressFn] = None,
+    algorithm: str = 'tv8',
+) -> Iterator[Allocation]:
+    """Tv8-algoritm (algorithm='classic': se allocate()):
 
     Fas A: "alla fr en" (om mjligt)
       - iterera deltagare i slumpad ordning
@@ -379,33 +1296,13 @@ def run_draw(seed: str) -> DrawResult:
     Not: Kategorier ignoreras.
     """
 
-    items = list_items()
-    participants = list_participants()
-    if not items:
-        raise ValueError('Inga artiklar inlagda')
-    if not participants:
-        raise ValueError('Inga deltagare registrerade')
-
-    run_id = f'run_{int(time.time())}'
-    rng = random.Random(seed)
-
-    clear_allocations()
-
-    # Preload votes matrix
-    votes_by_p: Dict[int, Dict[int, int]] = {}
-    for p in participants:
-        pid = int(p['id'])
-        votes_by_p[pid] = get_votes_for_participant(pid)
+    wins: Dict[int, int] = {pid: 0 for pid in data.participant_ids}
 
-    wins: Dict[int, int] = {int(p['id']): 0 for p in participants}
-    allocations_to_insert: List[Tuple] = []
+    t0 = time.perf_counter()
+    p0 = timings.get('persist', 0.0)
 
     # Remaining quantities per item
-    remaining_qty: Dict[int, int] = {}
-    for it in items:
-        iid = int(it['id'])
-        qty = int(it['quantity']) if it['quantity'] is not None else 1
-        remaining_qty[iid] = max(1, qty)
+    remaining_qty: Dict[int, int] = {iid: data.quantities[iid] for iid in data.item_ids}
 
     def take_one_unit(item_id: int) -> bool:
         q = remaining_qty.get(item_id, 0)
@@ -414,26 +1311,20 @@ def run_draw(seed: str) -> DrawResult:
         remaining_qty[item_id] = q - 1
         return True
 
-    def remaining_units() -> List[int]:
-        units: List[int] = []
-        for iid, q in remaining_qty.items():
-            if q > 0:
-                units.extend([iid] * q)
-        return units
-
     # -------- Fas A: alla fr en frst --------
-    pids = [int(p['id']) for p in participants]
+    # (inte i classic; shuffle av en tom lista drar inga slumptal)
+    pids = list(data.participant_ids) if algorithm == 'tv8' else []
     rng.shuffle(pids)
+    votes_by_p = data.votes_in_item_order()
+    n_a, step = len(pids), progress_step(len(pids))
 
-    for pid in pids:
+    for k, pid in enumerate(pids):
+        if progress is not None and k % step == 0:
+            progress('A', k, n_a)
         # Kandidater: artiklar med kvarvarande qty och pts > 0
         item_weights: Dict[int, float] = {}
-        pv = votes_by_p.get(pid, {})
-        for iid, q in remaining_qty.items():
-            if q <= 0:
-                continue
-            pts = int(pv.get(iid, 0))
-            if pts > 0:
+        for iid, pts in votes_by_p[pid]:
+            if remaining_qty[iid] > 0:
                 item_weights[iid] = float(pts)
 
         if not item_weights:
@@ -444,59 +1335,156 @@ def run_draw(seed: str) -> DrawResult:
             continue
 
         wins[pid] += 1
-        snap = {'phase': 'A', 'item_weights': item_weights}
-        allocations_to_insert.append((run_id, chosen_item, pid, json.dumps(snap), int(time.time())))
+        yield (chosen_item, pid, {'phase': 'A', 'item_weights': item_weights})
 
-    # -------- Fas B: dela ut resterande (rttvist) --------
-    # Dra mest "konkurrens" frst (hg totalpong), sedan namn
-    comp = compute_item_competition_scores()
-    name_by_id = {int(r['id']): str(r['name']) for r in items}
-
-    units = remaining_units()
-    units.sort(key=lambda iid: (comp.get(int(iid), 0), name_by_id.get(int(iid), '').lower()), reverse=True)
+    if progress is not None:
+        progress('A', n_a, n_a)
+    t1 = time.perf_counter()
+    p1 = timings.get('persist', 0.0)
+    timings['phase_a'] = (t1 - t0) - (p1 - p0)
 
-    for iid in units:
-        # Kandidater med pts>0
+    # -------- Fas B: dela ut resterande (rttvist) --------
+    units = phase_b_units(data, remaining_qty)
+    n_b, step = len(units), progress_step(len(units))
+    for k, iid in enumerate(units):
+        if progress is not None and k % step == 0:
+            progress('B', k, n_b)
+        # Kandidater med pts>0 (bara artikelns röstande, inte alla deltagare)
         weight_snapshot: Dict[int, float] = {}
-        for pid in wins.keys():
-            pts = int(votes_by_p.get(pid, {}).get(iid, 0))
-            if pts <= 0:
-                continue
+        for pid, pts in data.voters_by_item.get(iid, ()):
             w = pts * mult_for_wins(wins[pid])
             if w > 0:
                 weight_snapshot[pid] = float(w)
 
         if not weight_snapshot:
+            if algorithm == 'classic':
+                # ingen har röstat på den: ingen vinnare
+                yield (iid, None, {'phase': 'B', 'participant_weights': {}})
+                continue
             # Restartikel: ge till slumpad bland dem med lgst wins
             min_w = min(wins.values()) if wins else 0
             candidates = [pid for pid, w in wins.items() if w == min_w]
             winner = rng.choice(candidates) if candidates else None
             if winner is not None:
                 wins[winner] += 1
-            snap = {'phase': 'B_rest', 'rule': 'min_wins', 'min_wins': min_w}
-            allocations_to_insert.append((run_id, iid, winner, json.dumps(snap), int(time.time())))
+            yield (iid, winner, {'phase': 'B_rest', 'rule': 'min_wins', 'min_wins': min_w})
             continue
 
+        # weighted_choice och inte sampler.WeightedSampler: snapshoten ovan är
+        # redan O(röstande), så ett träd gör inte uniten billigare
         winner = weighted_choice(rng, weight_snapshot)
         wins[winner] += 1
-        snap = {'phase': 'B', 'participant_weights': weight_snapshot}
-        allocations_to_insert.append((run_id, iid, winner, json.dumps(snap), int(time.time())))
+        yield (iid, winner, {'phase': 'B', 'participant_weights': weight_snapshot})
+
+    if progress is not None:
+        progress('B', n_b, n_b)
+    timings['phase_b'] = (time.perf_counter() - t1) - (timings.get('persist', 0.0) - p1)
+
 
-    exec_sql('INSERT INTO runs(id, seed, created_at) VALUES(?, ?, ?)', (run_id, seed, int(time.time())))
-    exec_many(
-        'INSERT INTO allocations(run_id, item_id, participant_id, weight_snapshot, created_at) VALUES(?, ?, ?, ?, ?)',
-        allocations_to_insert,
+def run_draw(seed: str, engine: Optional[str] = None, progress: Optional[DrawProgressFn] = None) -> DrawResult:
+    """Laddar data, kör lottningen (se _allocate_python) och sparar resultatet.
+
+    Allt sker i en transaktion: runs-raden, allokeringarna (som skrivs i block
+    om DRAW_BATCH_SIZE medan lottningen pågår) och gallring av dragningar
+    utöver RUNS_KEEP. Tidigare dragningar ligger kvar som historik. Minnet
+    växer inte med antalet units, och en krasch mitt i lämnar allt orört.
+
+    engine: 'python' eller 'numpy' (standard: DRAW_ENGINE).
+    Algoritmen väljs med DRAW_ALGORITHM (tv8 eller classic, se allocate()).
+    progress: se allocate(); anropas i den tråd som kör lottningen.
+    Tid per steg (load, phase_a, phase_b, persist) returneras i DrawResult.timings.
+    """
+    timings: Dict[str, float] = {'persist': 0.0}
+    encode_snap = json.dumps if SNAPSHOT_FORMAT == 'json' else snapshots.encode
+    count = 0
+
+    with tx() as con:
+        t0 = time.perf_counter()
+        data = load_draw_input()
+        timings['load'] = time.perf_counter() - t0
+
+        now = int(time.time())
+        run_id = _new_run_id(con)
+        con.execute('INSERT INTO runs(id, seed, created_at) VALUES(?, ?, ?)', (run_id, seed, now))
+
+        batch: List[Tuple] = []
+
+        def flush() -> None:
+            t = time.perf_counter()
+            con.executemany(
+                'INSERT INTO allocations(run_id, item_id, participant_id, weight_snapshot, created_at) VALUES(?, ?, ?, ?, ?)',
+                [(run_id, iid, pid, encode_snap(snap), now) for iid, pid, snap in batch],
+            )
+            batch.clear()
+            timings['persist'] += time.perf_counter() - t
+
+        for alloc in allocate(data, seed, engine, timings, progress):
+            batch.append(alloc)
+            count += 1
+            if len(batch) >= DRAW_BATCH_SIZE:
+                flush()
+        flush()
+        prune_runs()
+        bump_meta('alloc_version')
+
+        t = time.perf_counter()
+    timings['persist'] += time.perf_counter() - t  # COMMIT
+
+    if metrics.ENABLED:
+        for phase, seconds in timings.items():
+            metrics.observe('draw_phase', phase, seconds, count if phase == 'persist' else None)
+    log.info(
+        'draw %s: %d allocations, %s', run_id, count,
+        ', '.join(f'{k}={v:.3f}s' for k, v in timings.items()),
     )
-    bump_meta('alloc_version')
+    return DrawResult(run_id=run_id, seed=seed, timings=timings)
 
-    return DrawResult(run_id=run_id, seed=seed)
+
+def _new_run_id(con: sqlite3.Connection) -> str:
+    # Historiken sparas och gallras, så id:t tas i millisekunder: ett gallrat
+    # id ska inte kunna återanvändas (draw_jobs.run_id pekar på det)
+    base = f'run_{time.time_ns() // 1_000_000}'
+    run_id, k = base, 1
+    while con.execute('SELECT 1 FROM runs WHERE id = ?', (run_id,)).fetchone():
+        k += 1
+        run_id = f'{base}_{k}'
+    return run_id
 
 
 def get_latest_run_id() -> Optional[str]:
-    row = q_one('SELECT id FROM runs ORDER BY created_at DESC LIMIT 1')
+    """Senaste dragningen; cachad tills alloc_version ändras (index på runs.created_at)."""
+    return cached_by_versions('latest_run_id', ('alloc_version',), _load_latest_run_id)
+
+
+def _load_latest_run_id() -> Optional[str]:
+    row = q_one('SELECT id FROM runs ORDER BY created_at DESC, rowid DESC LIMIT 1')
     return str(row['id']) if row else None
 
 
+def list_runs() -> List[sqlite3.Row]:
+    """Sparade dragningar, senaste först, med antal allokeringar."""
+    return cached_by_versions('list_runs', ('alloc_version',), _load_runs)
+
+
+def _load_runs() -> List[sqlite3.Row]:
+    return q_all(
+        """
+        SELECT r.id, r.seed, r.created_at,
+               (SELECT COUNT(*) FROM allocations a WHERE a.run_id = r.id) AS allocations
+        FROM runs r
+        ORDER BY r.created_at DESC, r.rowid DESC
+        """
+    )
+
+
+def get_allocation_snapshot(alloc_id: int) -> Optional[Dict[str, Any]]:
+    """Avkodad weight_snapshot för en allokering (binär eller äldre JSON), för granskning."""
+    row = q_one('SELECT weight_snapshot FROM allocations WHERE id = ?', (alloc_id,))
+    if row is None:
+        return None
+    return snapshots.decode(row['weight_snapshot'])
+
+
 def get_results(run_id: str) -> List[sqlite3.Row]:
     return q_all(
         """
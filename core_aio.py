@@ -0,0 +1,105 @@
+# language: python
+"""core_aio.py
+
+Async-fasad över core för NiceGUI-sidorna.
+
+Blockerande anrop (import, sparande, tyngre frågor) körs i en begränsad
+trådpool så att eventloopen fortsätter att svara för alla anslutna under
+tiden. Trådar och inte processer: core håller en SQLite-anslutning per tråd
+och publicerar ändringar (core.subscribe) i den egna processen, och det mesta
+av arbetet sker i SQLite, som släpper GIL.
+
+Lottningen går inte härigenom utan körs som bakgrundsjobb (draw_jobs.start).
+
+Progress-callbacks körs i loopen (inte i arbetstråden), så de kan uppdatera
+UI-element direkt. Kommer de tätare än loopen hinner med levereras bara det
+senaste värdet.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import IO, Any, Callable, Optional, TypeVar, Union
+
+import core
+
+log = logging.getLogger(__name__)
+
+AIO_WORKERS = int(os.environ.get('CORE_AIO_WORKERS', '4'))
+
+T = TypeVar('T')
+
+_pool: Optional[ThreadPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _executor() -> ThreadPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=AIO_WORKERS, thread_name_prefix='core-aio')
+        return _pool
+
+
+def shutdown() -> None:
+    """Väntar in pågående jobb och stänger poolen (app.on_shutdown)."""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=True)
+
+
+async def run(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Kör fn(*args, **kwargs) i poolen och väntar in resultatet utan att blockera loopen."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor(), functools.partial(fn, *args, **kwargs))
+
+
+def on_loop(callback: Optional[Callable[..., None]]) -> Optional[Callable[..., None]]:
+    """Gör callback anropbar från en arbetstråd: anropet körs i den nuvarande loopen.
+
+    Bara det senaste argumentet levereras om flera hinner komma innan loopen
+    kör callbacken.
+    """
+    if callback is None:
+        return None
+    loop = asyncio.get_running_loop()
+    lock = threading.Lock()
+    state: dict = {'args': None, 'scheduled': False}
+
+    def deliver() -> None:
+        with lock:
+            args = state['args']
+            state['scheduled'] = False
+        try:
+            callback(*args)
+        except Exception:
+            log.exception('progress callback failed')
+
+    def call(*args: Any) -> None:
+        with lock:
+            state['args'] = args
+            if state['scheduled']:
+                return
+            state['scheduled'] = True
+        try:
+            loop.call_soon_threadsafe(deliver)
+        except RuntimeError:  # loopen är stängd
+            pass
+
+    return call
+
+
+async def import_items_file(
+    source: Union[str, IO[bytes]],
+    filename: str,
+    progress: Optional[core.ProgressFn] = None,
+) -> core.ImportResult:
+    """core.import_items_file i poolen; progress(rader, andel) körs i loopen."""
+    return await run(core.import_items_file, source, filename, progress=on_loop(progress))
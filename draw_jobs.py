@@ -0,0 +1,221 @@
+# language: python
+"""draw_jobs.py
+
+Lottning som spårat bakgrundsjobb (tabellen draw_jobs).
+
+Status: queued -> running -> done / failed / cancelled.
+
+Jobben körs ett i taget i en egen tråd. Själva lottningen är core.run_draw,
+som skriver runs/allocations i en transaktion; runs ändras alltså bara när
+ett jobb blir klart, och ett avbrutet eller misslyckat jobb lämnar föregående
+resultat orört.
+
+Progress (fas A: k/N deltagare, fas B: k/M units) hålls i minnet medan jobbet
+kör: run_draw håller skrivlåset, så progress kan inte skrivas till tabellen
+förrän efteråt. Ändringar publiceras på ämnet 'jobs_version' (core.subscribe);
+get() ger tabellraden med aktuell progress.
+
+Avbrott: cancel() sätter bara en flagga (ingen skrivning, så den väntar aldrig
+på skrivlåset). Flaggan kontrolleras när jobbet startar och vid varje
+progress-anrop (ungefär core.DRAW_PROGRESS_STEPS gånger per fas);
+transaktionen rullas då tillbaka och jobbet blir cancelled.
+
+Statusskrivningarna (running och slutstatus) görs om några gånger om
+databasen är låst. Lyckas de ändå inte står raden kvar som aktiv utan något
+jobb bakom; get()/latest() visar en sådan rad som failed, och cancel() skriver
+failed på den. shutdown() (app.on_shutdown) avbryter aktiva jobb och väntar in
+tråden.
+"""
+
+from __future__ import annotations
+
+import logging
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+
+import core
+
+log = logging.getLogger(__name__)
+
+ACTIVE_STATES = ('queued', 'running')
+TOPIC = 'jobs_version'
+
+STATUS_WRITE_ATTEMPTS = 5
+STATUS_RETRY_DELAY = 0.2   # sekunder, dubblas per försök
+ORPHAN_ERROR = 'Jobbet körs inte längre (status kunde inte sparas)'
+
+
+class DrawCancelled(Exception):
+    pass
+
+
+@dataclass
+class _Live:
+    phase: Optional[str] = None
+    done: int = 0
+    total: int = 0
+    cancel: threading.Event = field(default_factory=threading.Event)
+
+
+_lock = threading.Lock()
+_live: Dict[int, _Live] = {}
+_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='draw-job')
+
+
+def start(seed: str, engine: Optional[str] = None) -> int:
+    """Lägger ett lottningsjobb i kön och returnerar dess id."""
+    job_id = None
+    try:
+        with core.tx() as con:
+            cur = con.execute(
+                "INSERT INTO draw_jobs(seed, engine, status, created_at) VALUES(?, ?, 'queued', ?)",
+                (seed, engine, int(time.time())),
+            )
+            job_id = int(cur.lastrowid)
+            # före COMMIT: ingen ska hinna se raden utan _live (= övergiven)
+            with _lock:
+                _live[job_id] = _Live()
+            core.bump_meta(TOPIC)
+        _pool.submit(_run, job_id, seed, engine)
+    except BaseException:
+        if job_id is not None:
+            with _lock:
+                _live.pop(job_id, None)
+        raise
+    return job_id
+
+
+def cancel(job_id: int) -> bool:
+    """Begär avbrott. Övergivna aktiva rader markeras failed. False om jobbet inte är aktivt."""
+    with _lock:
+        live = _live.get(job_id)
+    if live is None:
+        return _fail_orphan(job_id)
+    live.cancel.set()
+    core.publish((TOPIC,))
+    return True
+
+
+def shutdown() -> None:
+    """Avbryter aktiva jobb och väntar in jobbtråden (app.on_shutdown)."""
+    with _lock:
+        lives = list(_live.values())
+    for live in lives:
+        live.cancel.set()
+    # köade jobb startar, ser flaggan och skriver cancelled
+    _pool.shutdown(wait=True)
+
+
+def get(job_id: int) -> Optional[Dict[str, Any]]:
+    """Jobbets rad som dict, med aktuell progress om det kör och cancel_requested."""
+    row = core.q_one('SELECT * FROM draw_jobs WHERE id = ?', (job_id,))
+    return _with_live(row) if row else None
+
+
+def latest() -> Optional[Dict[str, Any]]:
+    row = core.q_one('SELECT * FROM draw_jobs ORDER BY id DESC LIMIT 1')
+    return _with_live(row) if row else None
+
+
+def fail_stale() -> int:
+    """Markerar jobb som var aktiva när processen avslutades som failed (körs vid start)."""
+    return _write_status(
+        "UPDATE draw_jobs SET status = 'failed', error = ?, finished_at = ? "
+        "WHERE status IN ('queued', 'running')",
+        ('Avbrutet (servern startades om)', int(time.time())),
+    )
+
+
+def _with_live(row: Any) -> Dict[str, Any]:
+    job = dict(row)
+    with _lock:
+        live = _live.get(job['id'])
+    job['cancel_requested'] = live is not None and live.cancel.is_set()
+    if live is None and job['status'] in ACTIVE_STATES:
+        # aktiv i tabellen men inget jobb bakom: slutstatus gick inte att skriva
+        job.update(status='failed', error=job['error'] or ORPHAN_ERROR)
+    elif live is not None and job['status'] == 'running':
+        job.update(phase=live.phase, done=live.done, total=live.total)
+    return job
+
+
+def _fail_orphan(job_id: int) -> bool:
+    with _lock:
+        if job_id in _live:
+            return False
+    written = _write_status(
+        "UPDATE draw_jobs SET status = 'failed', error = COALESCE(error, ?), finished_at = ? "
+        "WHERE id = ? AND status IN ('queued', 'running')",
+        (ORPHAN_ERROR, int(time.time()), job_id),
+    )
+    return bool(written)
+
+
+def _write_status(sql: str, params: tuple) -> int:
+    """Kör en statusändring i en egen transaktion, med nya försök om databasen är låst.
+
+    Returnerar antal ändrade rader, 0 om alla försök misslyckades (loggas).
+    """
+    delay = STATUS_RETRY_DELAY
+    for attempt in range(1, STATUS_WRITE_ATTEMPTS + 1):
+        try:
+            with core.tx() as con:
+                n = con.execute(sql, params).rowcount
+                if n:
+                    core.bump_meta(TOPIC)
+            return n
+        except sqlite3.OperationalError as ex:
+            if attempt == STATUS_WRITE_ATTEMPTS:
+                log.exception('draw job status write failed after %d attempts', attempt)
+                return 0
+            log.warning('draw job status write failed (%s), retrying in %.1f s', ex, delay)
+            time.sleep(delay)
+            delay *= 2
+    return 0
+
+
+def _run(job_id: int, seed: str, engine: Optional[str]) -> None:
+    with _lock:
+        live = _live[job_id]
+    try:
+        if live.cancel.is_set():  # avbrutet medan det låg i kön
+            _finish(job_id, live, 'cancelled')
+            return
+        if not _write_status(
+            "UPDATE draw_jobs SET status = 'running', started_at = ? WHERE id = ?",
+            (int(time.time()), job_id),
+        ):
+            _finish(job_id, live, 'failed', error='Kunde inte starta (databasen var låst)')
+            return
+
+        def progress(phase: str, done: int, total: int) -> None:
+            if live.cancel.is_set():
+                raise DrawCancelled()
+            live.phase, live.done, live.total = phase, done, total
+            core.publish((TOPIC,))
+
+        try:
+            res = core.run_draw(seed, engine, progress)
+        except DrawCancelled:
+            _finish(job_id, live, 'cancelled')
+        except Exception as ex:
+            log.exception('draw job %d failed', job_id)
+            _finish(job_id, live, 'failed', error=str(ex))
+        else:
+            _finish(job_id, live, 'done', run_id=res.run_id)
+    finally:
+        with _lock:
+            _live.pop(job_id, None)
+
+
+def _finish(job_id: int, live: _Live, status: str, run_id: Optional[str] = None, error: Optional[str] = None) -> None:
+    # misslyckas även sista försöket visar _with_live raden som failed när _live tas bort
+    _write_status(
+        'UPDATE draw_jobs SET status = ?, phase = ?, done = ?, total = ?, run_id = ?, error = ?, finished_at = ? '
+        'WHERE id = ?',
+        (status, live.phase, live.done, live.total, run_id, error, int(time.time()), job_id),
+    )
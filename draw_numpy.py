@@ -0,0 +1,176 @@
+# language: python
+"""draw_numpy.py
+
+Vektoriserad lottningsmotor för core.run_draw (DRAW_ENGINE=numpy).
+
+Rösterna läses in i en gles matris (deltagare x artiklar) som lagras två
+gånger: radvis (fas A: en deltagares artiklar) och kolumnvis (fas B: en
+artikels röstande). Wins och kvarvarande antal hålls i arrayer och vikterna
+räknas vektoriserat, så en unit i fas B kostar O(röstande på artikeln) i
+stället för O(alla deltagare). Dragningen i fas B går via sampler.WeightedSampler.
+
+RNG-kontrakt: identiskt med Python-motorn (core._allocate_python). Samma
+random.Random(seed) används med samma anrop i samma ordning (shuffle, random,
+choice), vikterna ligger i samma ordning som Python-motorns dictar och urvalet
+ger samma index som core.weighted_choice (fas A: samma sekventiella kumulativa
+summa, fas B: WeightedSampler, som garanterar samma svar).
+Fördelning och snapshots blir därför bit för bit lika för en given seed.
+"""
+
+from __future__ import annotations
+
+import random
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+import core
+from sampler import WeightedSampler
+
+
+def _choose(rng: random.Random, w: np.ndarray, w_list: List[float]) -> int:
+    """Index enligt core.weighted_choice för vikterna w (w_list = w.tolist())."""
+    # Pythons sum() (inte np.sum) så att totalen avrundas exakt som i weighted_choice
+    total = sum(w_list)
+    if total <= 0:
+        raise ValueError('No positive weights')
+    r = rng.random() * total
+    i = int(np.searchsorted(np.cumsum(w), r, side='right'))
+    return i if i < len(w_list) else 0
+
+
+def _sparse(
+    major: np.ndarray, minor: np.ndarray, values: np.ndarray, n_major: int
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """CSR-liknande lagring: (ptr, minor-index, värden), sorterat på (major, minor)."""
+    order = np.lexsort((minor, major))
+    counts = np.bincount(major, minlength=n_major)
+    ptr = np.zeros(n_major + 1, dtype=np.int64)
+    np.cumsum(counts, out=ptr[1:])
+    return ptr, minor[order], values[order]
+
+
+def allocate(
+    data: core.DrawInput,
+    rng: random.Random,
+    timings: Dict[str, float],
+    progress: Optional[core.DrawProgressFn] = None,
+    algorithm: str = 'tv8',
+) -> Iterator[core.Allocation]:
+    t0 = time.perf_counter()
+    p0 = timings.get('persist', 0.0)
+    item_ids = np.asarray(data.item_ids, dtype=np.int64)
+    pids = np.asarray(data.participant_ids, dtype=np.int64)
+    n_items = len(data.item_ids)
+    n_p = len(data.participant_ids)
+    item_pos: Dict[int, int] = {iid: k for k, iid in enumerate(data.item_ids)}
+    p_pos: Dict[int, int] = {pid: k for k, pid in enumerate(data.participant_ids)}
+
+    # voters_by_item innehåller bara positiva poäng (båda faserna hoppar över pts <= 0)
+    rows: List[int] = []
+    cols: List[int] = []
+    vals: List[int] = []
+    for ii, iid in enumerate(data.item_ids):
+        for pid, pts in data.voters_by_item.get(iid, ()):
+            rows.append(p_pos[pid])
+            cols.append(ii)
+            vals.append(pts)
+
+    r_idx = np.asarray(rows, dtype=np.int64)
+    c_idx = np.asarray(cols, dtype=np.int64)
+    pts_all = np.asarray(vals, dtype=np.int64)
+    by_p_ptr, by_p_items, by_p_pts = _sparse(r_idx, c_idx, pts_all, n_p)
+    by_i_ptr, by_i_voters, by_i_pts = _sparse(c_idx, r_idx, pts_all, n_items)
+
+    remaining = np.asarray([data.quantities[iid] for iid in data.item_ids], dtype=np.int64)
+    wins = np.zeros(n_p, dtype=np.int64)
+
+    # -------- Fas A (inte i classic) --------
+    # Varje deltagare har egna vikter (sina artiklar), så här finns inget träd att
+    # uppdatera: slutsålda filtreras bort och urvalet är en kumulativ summa.
+    order = list(data.participant_ids) if algorithm == 'tv8' else []
+    rng.shuffle(order)
+    n_a, step = len(order), core.progress_step(len(order))
+
+    for k, pid in enumerate(order):
+        if progress is not None and k % step == 0:
+            progress('A', k, n_a)
+        pi = p_pos[pid]
+        a, b = by_p_ptr[pi], by_p_ptr[pi + 1]
+        if a == b:
+            continue
+        cand = by_p_items[a:b]
+        open_ = remaining[cand] > 0
+        cand = cand[open_]
+        if cand.size == 0:
+            continue
+        w = by_p_pts[a:b][open_].astype(np.float64)
+        w_list = w.tolist()
+
+        ii = int(cand[_choose(rng, w, w_list)])
+        remaining[ii] -= 1
+        wins[pi] += 1
+        snap = {'phase': 'A', 'item_weights': dict(zip(item_ids[cand].tolist(), w_list))}
+        yield (int(item_ids[ii]), pid, snap)
+
+    if progress is not None:
+        progress('A', n_a, n_a)
+    t1 = time.perf_counter()
+    p1 = timings.get('persist', 0.0)
+    timings['phase_a'] = (t1 - t0) - (p1 - p0)
+
+    # -------- Fas B --------
+    remaining_qty = {iid: int(q) for iid, q in zip(data.item_ids, remaining.tolist())}
+    units = core.phase_b_units(data, remaining_qty)
+
+    # mult_for_wins som uppslagstabell; wins kan som mest bli antalet units
+    max_wins = int(wins.max(initial=0)) + len(units)
+    mult = np.asarray([core.mult_for_wins(k) for k in range(max_wins + 1)], dtype=np.float64)
+
+    # Units av samma artikel ligger i följd: vikterna byggs en gång per artikel och
+    # bara vinnarens vikt ändras mellan dragningarna. Urvalet är O(log v), men
+    # snapshoten (snap_weights) kostar ändå O(v) per unit.
+    cur_item = None
+    voters = by_i_voters[:0]
+    voter_pts: List[int] = []
+    picker = None
+
+    n_b, step = len(units), core.progress_step(len(units))
+    for u, iid in enumerate(units):
+        if progress is not None and u % step == 0:
+            progress('B', u, n_b)
+        if iid != cur_item:
+            cur_item = iid
+            ii = item_pos[iid]
+            a, b = by_i_ptr[ii], by_i_ptr[ii + 1]
+            voters = by_i_voters[a:b]
+            voter_pts = by_i_pts[a:b].tolist()
+            w = by_i_pts[a:b] * mult[wins[voters]]
+            picker = WeightedSampler(w.tolist()) if bool((w > 0).any()) else None
+
+        if picker is None or picker.total <= 0:
+            if algorithm == 'classic':
+                # ingen har röstat på den: ingen vinnare
+                yield (iid, None, {'phase': 'B', 'participant_weights': {}})
+                continue
+            # Restartikel: ge till slumpad bland dem med lägst wins
+            min_w = int(wins.min())
+            candidates = np.flatnonzero(wins == min_w)
+            k = candidates[rng.choice(range(candidates.size))]
+            wins[k] += 1
+            snap = {'phase': 'B_rest', 'rule': 'min_wins', 'min_wins': min_w}
+            yield (iid, int(pids[k]), snap)
+            continue
+
+        w_list = picker.weights()
+        snap_weights = {pid: wt for pid, wt in zip(pids[voters].tolist(), w_list) if wt > 0}
+        j = picker.sample(rng)
+        k = int(voters[j])
+        wins[k] += 1
+        picker.set(j, voter_pts[j] * float(mult[wins[k]]))
+        yield (iid, int(pids[k]), {'phase': 'B', 'participant_weights': snap_weights})
+
+    if progress is not None:
+        progress('B', n_b, n_b)
+    timings['phase_b'] = (time.perf_counter() - t1) - (timings.get('persist', 0.0) - p1)
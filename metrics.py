@@ -0,0 +1,185 @@
+# language: python
+"""metrics.py
+
+Lätt instrumentering: antal anrop, latens-histogram och antal rader per
+namngiven fråga, lottningsfas och sidrefresh. Exponeras i Prometheus
+textformat (render(), /metrics i app.py).
+
+Avstängt som standard (METRICS=1 slår på). Avstängt kostar det en
+attributläsning per anrop: core kontrollerar metrics.ENABLED innan något
+mäts, och timed() ger ett delat no-op-objekt.
+
+Sorter (kind) och namn:
+  query       SQL-text (hopdragen, max 80 tecken) från core.q_all/q_one/exec_*
+  draw_phase  load / phase_a / phase_b / persist från core.run_draw
+  refresh     sidornas uppdateringar, t.ex. 'totals.items'
+  cache       cached_by_versions, namn:hit / namn:miss (bara antal)
+"""
+
+from __future__ import annotations
+
+import functools
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, List, Optional, Tuple
+
+ENABLED = os.environ.get('METRICS', '0') == '1'
+PREFIX = 'raffle'
+
+# sekunder; +Inf läggs till i render()
+BUCKETS: Tuple[float, ...] = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+NAME_MAX = 80
+
+
+class _Series:
+    __slots__ = ('buckets', 'count', 'sum', 'rows')
+
+    def __init__(self) -> None:
+        self.buckets = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.rows = 0
+
+
+_lock = threading.Lock()
+_series: Dict[Tuple[str, str], _Series] = {}
+_names: Dict[str, str] = {}
+
+
+def query_name(sql: str) -> str:
+    """Kort, stabilt namn för en SQL-text (cachat per text)."""
+    name = _names.get(sql)
+    if name is None:
+        name = ' '.join(sql.split())
+        if len(name) > NAME_MAX:
+            name = name[:NAME_MAX - 1] + '…'
+        _names[sql] = name
+    return name
+
+
+def observe(kind: str, name: str, seconds: Optional[float], rows: Optional[int] = None) -> None:
+    """Registrerar ett anrop. seconds=None räknar bara (inget i histogrammet)."""
+    key = (kind, name)
+    with _lock:
+        s = _series.get(key)
+        if s is None:
+            s = _series[key] = _Series()
+        s.count += 1
+        if seconds is not None:
+            s.buckets[bisect_left(BUCKETS, seconds)] += 1
+            s.sum += seconds
+        if rows:
+            s.rows += rows
+
+
+def inc(kind: str, name: str) -> None:
+    observe(kind, name, None)
+
+
+class _Timer:
+    __slots__ = ('kind', 'name', 'rows', '_t0')
+
+    def __init__(self, kind: str, name: str) -> None:
+        self.kind = kind
+        self.name = name
+        self.rows: Optional[int] = None
+
+    def __enter__(self) -> '_Timer':
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        observe(self.kind, self.name, time.perf_counter() - self._t0, self.rows)
+
+
+class _NoTimer:
+    __slots__ = ()
+    rows = None
+
+    def __enter__(self) -> '_NoTimer':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        pass
+
+    def __setattr__(self, name: str, value: object) -> None:
+        pass
+
+
+_NO_TIMER = _NoTimer()
+
+
+def timed(kind: str, name: str):
+    """with timed('refresh', 'totals.items') as m: ...; m.rows = len(rows)"""
+    return _Timer(kind, name) if ENABLED else _NO_TIMER
+
+
+def timed_query(sql: str):
+    """timed('query', query_name(sql)); namnet räknas bara fram när mätning är på."""
+    return _Timer('query', query_name(sql)) if ENABLED else _NO_TIMER
+
+
+def instrument(kind: str, name: Optional[str] = None):
+    """Dekorator för timed(); avstängt returneras funktionen oförändrad."""
+    def wrap(fn):
+        if not ENABLED:
+            return fn
+        label = name or fn.__qualname__
+
+        @functools.wraps(fn)
+        def inner(*args, **kwargs):
+            with _Timer(kind, label):
+                return fn(*args, **kwargs)
+
+        return inner
+    return wrap
+
+
+def reset() -> None:
+    with _lock:
+        _series.clear()
+
+
+def _label(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', ' ')
+
+
+def render() -> str:
+    """Alla serier i Prometheus textformat (version 0.0.4)."""
+    with _lock:
+        snapshot = [(k, n, list(s.buckets), s.count, s.sum, s.rows) for (k, n), s in sorted(_series.items())]
+
+    by_kind: Dict[str, List[tuple]] = {}
+    for row in snapshot:
+        by_kind.setdefault(row[0], []).append(row)
+
+    out: List[str] = []
+    for kind, rows in by_kind.items():
+        base = f'{PREFIX}_{kind}'
+        timed_rows = [r for r in rows if sum(r[2])]  # inc() ger bara antal
+        if timed_rows:
+            out.append(f'# HELP {base}_seconds Latens per {kind}.')
+            out.append(f'# TYPE {base}_seconds histogram')
+        for _, name, buckets, _count, total, _rows in timed_rows:
+            lbl = f'name="{_label(name)}"'
+            acc = 0
+            for le, n in zip(BUCKETS + (float('inf'),), buckets):
+                acc += n
+                le_text = '+Inf' if le == float('inf') else repr(le)
+                out.append(f'{base}_seconds_bucket{{{lbl},le="{le_text}"}} {acc}')
+            out.append(f'{base}_seconds_sum{{{lbl}}} {total:.6f}')
+            out.append(f'{base}_seconds_count{{{lbl}}} {acc}')
+        out.append(f'# HELP {base}_calls_total Antal anrop per {kind}.')
+        out.append(f'# TYPE {base}_calls_total counter')
+        for _, name, _b, count, _t, _rows in rows:
+            out.append(f'{base}_calls_total{{name="{_label(name)}"}} {count}')
+        out.append(f'# HELP {base}_rows_total Rader per {kind}.')
+        out.append(f'# TYPE {base}_rows_total counter')
+        for _, name, _b, _c, _t, nrows in rows:
+            out.append(f'{base}_rows_total{{name="{_label(name)}"}} {nrows}')
+    return '\n'.join(out) + '\n'
@@ -0,0 +1,142 @@
+# language: python
+"""sampler.py
+
+Viktat urval med uppdaterbara vikter (summaträd).
+
+WeightedSampler ger samma svar som core.weighted_choice för samma
+slumptal, men ett enskilt urval och en viktändring kostar O(log n) i stället
+för O(n). Trädets delsummor avrundas annorlunda än weighted_choice:s sekventiella
+summa, så varje dragning kontrolleras mot en felgräns: hamnar slumptalet så
+nära en intervallgräns att avrundningen kan avgöra, görs dragningen om exakt
+som weighted_choice (linjärt). Det händer i praktiken aldrig men gör resultatet
+bit för bit identiskt.
+
+Index med vikt 0 räknas som borttagna.
+
+Används bara i numpy-motorns fas B. En lottning blir inte O(log n) per unit
+för det: varje allokering sparar sina vikter (weight_snapshot), och att bygga
+dem kostar O(röstande på artikeln) per unit oavsett hur urvalet görs. Därför
+behåller core._allocate_python weighted_choice.
+"""
+
+from __future__ import annotations
+
+import random
+from typing import List, Sequence
+
+_EPS = 2.0 ** -52
+
+
+class WeightedSampler:
+    def __init__(self, weights: Sequence[float]) -> None:
+        n = len(weights)
+        size = 1
+        while size < n:
+            size *= 2
+        tree = [0.0] * (2 * size)
+        for i, w in enumerate(weights):
+            w = float(w)
+            if not w >= 0:
+                raise ValueError('Vikter måste vara >= 0')
+            tree[size + i] = w
+        for i in range(size - 1, 0, -1):
+            tree[i] = tree[2 * i] + tree[2 * i + 1]
+
+        self._n = n
+        self._size = size
+        self._depth = size.bit_length()
+        self._tree = tree
+        self._positive = sum(1 for w in tree[size:size + n] if w > 0)
+
+    def __len__(self) -> int:
+        return self._n
+
+    @property
+    def total(self) -> float:
+        return self._tree[1]
+
+    def weight(self, i: int) -> float:
+        return self._tree[self._size + i]
+
+    def weights(self) -> List[float]:
+        return self._tree[self._size:self._size + self._n]
+
+    def set(self, i: int, w: float) -> None:
+        """Sätter vikt för index i (0 = ta bort ur urvalet)."""
+        if not 0 <= i < self._n:
+            raise IndexError(i)
+        w = float(w)
+        if not w >= 0:
+            raise ValueError('Vikter måste vara >= 0')
+        tree = self._tree
+        node = self._size + i
+        self._positive += (w > 0) - (tree[node] > 0)
+        tree[node] = w
+        # Räkna om föräldrarna (inte +delta), så att felet inte växer med antalet uppdateringar
+        node //= 2
+        while node:
+            tree[node] = tree[2 * node] + tree[2 * node + 1]
+            node //= 2
+
+    def _prefix(self, i: int) -> float:
+        """Trädsumman av vikterna för index [0, i)."""
+        tree = self._tree
+        acc = 0.0
+        lo = self._size
+        hi = self._size + i
+        while lo < hi:
+            if lo & 1:
+                acc += tree[lo]
+                lo += 1
+            if hi & 1:
+                hi -= 1
+                acc += tree[hi]
+            lo //= 2
+            hi //= 2
+        return acc
+
+    def _descend(self, r: float) -> int:
+        tree = self._tree
+        node = 1
+        base = 0.0
+        while node < self._size:
+            left = tree[2 * node]
+            if r < base + left:
+                node = 2 * node
+            else:
+                base += left
+                node = 2 * node + 1
+        return min(node - self._size, self._n - 1)
+
+    def pick(self, u: float) -> int:
+        """Index för slumptalet u i [0, 1), med weighted_choice-semantik."""
+        if self._positive == 0:
+            raise ValueError('No positive weights')
+        total = self._tree[1]
+        r = u * total
+        i = self._descend(r)
+
+        # Sekventiell summa (weighted_choice) och trädsummor avviker högst så här mycket
+        margin = (2 * self._n + 4 * self._depth + 16) * _EPS * total
+        lo = self._prefix(i)
+        hi = self._prefix(i + 1)
+        if lo + margin <= r and r + margin < hi:
+            return i
+        return self._pick_linear(u)
+
+    def _pick_linear(self, u: float) -> int:
+        items = [(i, w) for i, w in enumerate(self.weights()) if w > 0]
+        total = sum(w for _, w in items)
+        r = u * total
+        acc = 0.0
+        for i, w in items:
+            acc += w
+            if acc > r:
+                return i
+        return items[0][0]
+
+    def sample(self, rng: random.Random) -> int:
+        """Drar ett index; förbrukar ett rng.random() precis som weighted_choice."""
+        if self._positive == 0:
+            raise ValueError('No positive weights')
+        return self.pick(rng.random())
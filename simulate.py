@@ -0,0 +1,279 @@
+# language: python
+"""simulate.py
+
+Monte-Carlo-simulering av lottningen, för att pröva straffinställningar
+(WIN_MULT / MULT_AFTER) före ett event utan att röra databasen.
+
+Röstläget läses en gång (core.load_draw_input) och skickas till varje
+arbetsprocess när den startar; därefter körs core.allocate för tusentals
+seeds i en ProcessPoolExecutor. Ingenting skrivs (allocations och runs
+lämnas orörda).
+
+Per seed räknas:
+- wins per deltagare
+- nytta per deltagare: summan av deltagarens egna poäng på vunna artiklar
+- Gini för wins och för nytta
+- avund: andel deltagare som värderar (med sina egna poäng) någon annans
+  vinster högre än sina egna
+
+och aggregeras till fördelningen av wins, förväntade wins/nytta per deltagare
+och förväntat värde per artikel (medelpoäng som vinnaren gav artikeln, samt
+andel units som gick till någon som röstat på den).
+
+Kör:
+  python -m simulate [--seeds 2000] [--workers 8] [--win-mult 1,0.6,0.35,0.2] [--mult-after 0.1]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence
+
+import core
+
+# sätts per arbetsprocess av _init_worker
+_data: Optional[core.DrawInput] = None
+_points: Dict[int, Dict[int, int]] = {}        # pid -> {iid: points}
+_engine: Optional[str] = None
+
+
+@dataclass
+class SimulationResult:
+    seeds: int
+    seconds: float
+    # antal wins -> andel deltagare (medel över seeds)
+    wins_distribution: Dict[int, float]
+    expected_wins: Dict[int, float]           # pid -> medel
+    p_no_win: Dict[int, float]                # pid -> andel seeds utan vinst
+    expected_utility: Dict[int, float]        # pid -> medel egen poäng på vunna artiklar
+    item_value: Dict[int, float]              # iid -> medelpoäng som vinnaren gav artikeln
+    item_to_voter: Dict[int, float]           # iid -> andel units till någon som röstat på den
+    gini_wins: List[float] = field(default_factory=list)      # per seed
+    gini_utility: List[float] = field(default_factory=list)   # per seed
+    envy_rate: List[float] = field(default_factory=list)      # per seed
+
+
+def gini(values: Sequence[float]) -> float:
+    """Gini-koefficient (0 = helt jämnt, mot 1 = allt hos en)."""
+    xs = sorted(values)
+    n = len(xs)
+    total = sum(xs)
+    if n == 0 or total <= 0:
+        return 0.0
+    weighted = sum((i + 1) * x for i, x in enumerate(xs))
+    return (2 * weighted) / (n * total) - (n + 1) / n
+
+
+def _init_worker(
+    data: core.DrawInput,
+    win_mult: Optional[Dict[int, float]],
+    mult_after: Optional[float],
+    engine: Optional[str],
+) -> None:
+    global _data, _points, _engine
+    if win_mult is not None:
+        core.WIN_MULT = dict(win_mult)
+    if mult_after is not None:
+        core.MULT_AFTER = mult_after
+    _data = data
+    _engine = engine
+    _points = {}
+    for iid, voters in data.voters_by_item.items():
+        for pid, pts in voters:
+            _points.setdefault(pid, {})[iid] = pts
+
+
+def _simulate_seeds(seeds: Sequence[str]) -> dict:
+    """Kör seeds i den här processen och returnerar summor (slås ihop i _merge)."""
+    data = _data
+    pids = data.participant_ids
+    acc = {
+        'n': 0,
+        'wins_hist': Counter(),
+        'wins_sum': Counter(),
+        'no_win': Counter(),
+        'util_sum': Counter(),
+        'item_units': Counter(),
+        'item_voter_units': Counter(),
+        'item_value_sum': Counter(),
+        'gini_wins': [],
+        'gini_utility': [],
+        'envy_rate': [],
+    }
+    empty: Dict[int, int] = {}
+    for seed in seeds:
+        win_count: Dict[int, int] = defaultdict(int)
+        util: Dict[int, int] = defaultdict(int)
+        winners: Dict[int, List[int]] = defaultdict(list)   # iid -> vinnare
+        for iid, pid, _snap in core.allocate(data, seed, _engine):
+            acc['item_units'][iid] += 1
+            if pid is None:
+                continue
+            win_count[pid] += 1
+            winners[iid].append(pid)
+            pts = _points.get(pid, empty).get(iid, 0)
+            if pts > 0:
+                util[pid] += pts
+                acc['item_voter_units'][iid] += 1
+                acc['item_value_sum'][iid] += pts
+
+        wins = [win_count.get(pid, 0) for pid in pids]
+        utility = [util.get(pid, 0) for pid in pids]
+        for pid, w, u in zip(pids, wins, utility):
+            acc['wins_hist'][w] += 1
+            acc['wins_sum'][pid] += w
+            acc['util_sum'][pid] += u
+            if w == 0:
+                acc['no_win'][pid] += 1
+
+        # Avund: v_i(bundle_j) räknas bara över artiklar i har röstat på
+        envious = 0
+        for pid, u in zip(pids, utility):
+            other: Dict[int, int] = {}
+            for iid, pts in _points.get(pid, empty).items():
+                for j in winners.get(iid, ()):
+                    if j != pid:
+                        other[j] = other.get(j, 0) + pts
+            if other and max(other.values()) > u:
+                envious += 1
+
+        acc['n'] += 1
+        acc['gini_wins'].append(gini(wins))
+        acc['gini_utility'].append(gini(utility))
+        acc['envy_rate'].append(envious / len(pids) if pids else 0.0)
+    return acc
+
+
+def _merge(parts: List[dict], data: core.DrawInput, seconds: float) -> SimulationResult:
+    total: dict = {k: Counter() for k in ('wins_hist', 'wins_sum', 'no_win', 'util_sum',
+                                          'item_units', 'item_voter_units', 'item_value_sum')}
+    n = 0
+    lists: Dict[str, List[float]] = {'gini_wins': [], 'gini_utility': [], 'envy_rate': []}
+    for part in parts:
+        n += part['n']
+        for k in total:
+            total[k].update(part[k])
+        for k in lists:
+            lists[k].extend(part[k])
+
+    n_p = len(data.participant_ids)
+    return SimulationResult(
+        seeds=n,
+        seconds=seconds,
+        wins_distribution={k: c / (n * n_p) for k, c in sorted(total['wins_hist'].items())} if n and n_p else {},
+        expected_wins={pid: total['wins_sum'][pid] / n for pid in data.participant_ids} if n else {},
+        p_no_win={pid: total['no_win'][pid] / n for pid in data.participant_ids} if n else {},
+        expected_utility={pid: total['util_sum'][pid] / n for pid in data.participant_ids} if n else {},
+        item_value={
+            iid: total['item_value_sum'][iid] / total['item_voter_units'][iid]
+            for iid in data.item_ids if total['item_voter_units'][iid]
+        },
+        item_to_voter={
+            iid: total['item_voter_units'][iid] / total['item_units'][iid]
+            for iid in data.item_ids if total['item_units'][iid]
+        },
+        **lists,
+    )
+
+
+def simulate(
+    n_seeds: int,
+    data: Optional[core.DrawInput] = None,
+    win_mult: Optional[Dict[int, float]] = None,
+    mult_after: Optional[float] = None,
+    workers: Optional[int] = None,
+    engine: Optional[str] = None,
+    seed_prefix: str = 'sim',
+) -> SimulationResult:
+    """Kör n_seeds lottningar i minnet och aggregerar rättvisemått.
+
+    data: röstläget (standard: core.load_draw_input() från databasen).
+    win_mult/mult_after: straffinställningar att pröva (standard: core:s).
+    workers: antal processer (1 = i den här processen).
+    """
+    t0 = time.perf_counter()
+    if data is None:
+        data = core.load_draw_input()
+    workers = workers or os.cpu_count() or 1
+    seeds = [f'{seed_prefix}-{k}' for k in range(n_seeds)]
+    initargs = (data, win_mult, mult_after, engine)
+
+    if workers == 1:
+        saved = (core.WIN_MULT, core.MULT_AFTER)
+        try:
+            _init_worker(*initargs)
+            parts = [_simulate_seeds(seeds)]
+        finally:
+            core.WIN_MULT, core.MULT_AFTER = saved
+    else:
+        # några block per process jämnar ut lasten
+        size = max(1, -(-n_seeds // (workers * 4)))
+        chunks = [seeds[i:i + size] for i in range(0, n_seeds, size)]
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=initargs) as pool:
+            parts = list(pool.map(_simulate_seeds, chunks))
+
+    return _merge(parts, data, time.perf_counter() - t0)
+
+
+def _summary(values: List[float]) -> str:
+    if not values:
+        return '-'
+    qs = statistics.quantiles(values, n=20) if len(values) > 1 else [values[0]] * 19
+    return f'medel {statistics.fmean(values):.3f}  (p5 {qs[0]:.3f}, p95 {qs[-1]:.3f})'
+
+
+def print_report(res: SimulationResult, data: core.DrawInput, top: int = 10) -> None:
+    print(f'{res.seeds} seeds på {res.seconds:.1f} s ({res.seeds / res.seconds:.1f} seeds/s)')
+    print('\nFördelning av wins (andel deltagare):')
+    for k, share in res.wins_distribution.items():
+        print(f'  {k:>3} wins  {share:7.1%}')
+    print(f'\nGini wins:    {_summary(res.gini_wins)}')
+    print(f'Gini nytta:   {_summary(res.gini_utility)}')
+    print(f'Avund:        {_summary(res.envy_rate)}')
+
+    if res.p_no_win:
+        worst = sorted(res.p_no_win.items(), key=lambda kv: kv[1], reverse=True)[:top]
+        print('\nHögst risk att gå lottlös:')
+        for pid, p in worst:
+            print(f'  deltagare {pid:>6}  {p:6.1%}  (förväntade wins {res.expected_wins[pid]:.2f})')
+
+    if res.item_value:
+        print('\nLägst förväntat värde per artikel (vinnarens poäng):')
+        for iid, v in sorted(res.item_value.items(), key=lambda kv: kv[1])[:top]:
+            name = data.item_names.get(iid, str(iid))
+            print(f'  {name[:40]:<40} {v:6.1f}  (till röstande {res.item_to_voter.get(iid, 0):.0%})')
+
+
+def _parse_mult(text: Optional[str]) -> Optional[Dict[int, float]]:
+    if not text:
+        return None
+    return {k: float(v) for k, v in enumerate(text.split(','))}
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument('--seeds', type=int, default=1000)
+    ap.add_argument('--workers', type=int, default=None, help='standard: antal kärnor')
+    ap.add_argument('--win-mult', help='multiplikator för 0,1,2,... wins, t.ex. 1,0.6,0.35,0.2')
+    ap.add_argument('--mult-after', type=float, help='multiplikator efter sista i --win-mult')
+    ap.add_argument('--engine', choices=core.DRAW_ENGINES)
+    ap.add_argument('--top', type=int, default=10)
+    args = ap.parse_args(argv)
+
+    data = core.load_draw_input()
+    res = simulate(
+        args.seeds, data,
+        win_mult=_parse_mult(args.win_mult), mult_after=args.mult_after,
+        workers=args.workers, engine=args.engine,
+    )
+    print_report(res, data, args.top)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+# language: python
+"""snapshots.py
+
+Kompakt lagring av allocations.weight_snapshot.
+
+Binärt format (BLOB):
+  b'WS' | version (1 byte) | flaggor (1 byte, bit 0 = zlib) | kropp
+  kropp, little-endian:
+    'A' | n (uint32) | n x id (uint32) | n x vikt (float64)   fas A: item_weights
+    'B' | n (uint32) | n x id (uint32) | n x vikt (float64)   fas B: participant_weights
+    'R' | min_wins (int64)                                    fas B_rest
+
+Äldre rader innehåller JSON-text; decode() läser båda och ger samma struktur
+(id-nycklar som int). Avkodning görs bara när någon granskar en allokering.
+"""
+
+from __future__ import annotations
+
+import json
+import struct
+import zlib
+from typing import Any, Dict, Union
+
+MAGIC = b'WS'
+VERSION = 1
+FLAG_ZLIB = 1
+COMPRESS_MIN_BYTES = 64   # mindre kroppar lönar sig inte att komprimera
+ZLIB_LEVEL = 1
+
+_WEIGHT_KEYS = {b'A': ('A', 'item_weights'), b'B': ('B', 'participant_weights')}
+_PHASE_CODES = {'A': b'A', 'B': b'B'}
+
+
+def encode(snap: Dict[str, Any]) -> bytes:
+    phase = snap.get('phase')
+    if phase == 'B_rest':
+        body = b'R' + struct.pack('<q', int(snap['min_wins']))
+    elif phase in _PHASE_CODES:
+        weights = snap['item_weights' if phase == 'A' else 'participant_weights']
+        n = len(weights)
+        body = (
+            _PHASE_CODES[phase]
+            + struct.pack('<I', n)
+            + struct.pack(f'<{n}I', *weights.keys())
+            + struct.pack(f'<{n}d', *weights.values())
+        )
+    else:
+        raise ValueError(f'Okänd snapshot-fas: {phase!r}')
+
+    flags = 0
+    if len(body) >= COMPRESS_MIN_BYTES:
+        packed = zlib.compress(body, ZLIB_LEVEL)
+        if len(packed) < len(body):
+            body = packed
+            flags |= FLAG_ZLIB
+    return MAGIC + bytes((VERSION, flags)) + body
+
+
+def decode(value: Union[bytes, str, None]) -> Dict[str, Any]:
+    """Snapshot som dict, oavsett om raden är binär eller äldre JSON."""
+    if value is None:
+        return {}
+    if isinstance(value, str):
+        return _decode_json(value)
+
+    raw = bytes(value)
+    if raw[:2] != MAGIC:
+        return _decode_json(raw.decode('utf-8'))
+    if raw[2] != VERSION:
+        raise ValueError(f'Okänd snapshot-version: {raw[2]}')
+    body = raw[4:]
+    if raw[3] & FLAG_ZLIB:
+        body = zlib.decompress(body)
+
+    code = body[:1]
+    if code == b'R':
+        (min_wins,) = struct.unpack_from('<q', body, 1)
+        return {'phase': 'B_rest', 'rule': 'min_wins', 'min_wins': min_wins}
+    if code not in _WEIGHT_KEYS:
+        raise ValueError(f'Okänd snapshot-fas: {code!r}')
+    phase, key = _WEIGHT_KEYS[code]
+    (n,) = struct.unpack_from('<I', body, 1)
+    ids = struct.unpack_from(f'<{n}I', body, 5)
+    weights = struct.unpack_from(f'<{n}d', body, 5 + 4 * n)
+    return {'phase': phase, key: dict(zip(ids, weights))}
+
+
+def _decode_json(text: str) -> Dict[str, Any]:
+    snap = json.loads(text) if text else {}
+    for key in ('item_weights', 'participant_weights'):
+        if key in snap:
+            snap[key] = {int(k): float(v) for k, v in snap[key].items()}
+    if snap and 'phase' not in snap:
+        # allra äldsta formatet: bara {participant_id: weight}
+        snap = {'phase': 'B', 'participant_weights': {int(k): float(v) for k, v in snap.items()}}
+    return snap
@@ -17,12 +17,17 @@ Innehåller:
 
 from __future__ import annotations
 
+import io
 import time
 from typing import Dict, List
 
 from nicegui import ui, app
 
-import oldcore.core as core
+import core
+import core_aio
+import draw_jobs
+import metrics
+from ui_common import LiveTable, rows_signature
 
 
 def require_admin() -> None:
@@ -64,29 +69,70 @@ def register_admin_pages() -> None:
         with ui.card().classes('w-full'):
             ui.label('1) Kontroller: rensa och ladda upp').classes('text-lg font-medium')
 
-            with ui.row().classes('gap-3 items-center'):
-                ui.button(
-                    'Rensa allt (artiklar + röster + resultat)',
-                    on_click=lambda: (
-                        core.clear_items_and_votes_and_allocations(),
-                        ui.notify('Allt rensat', color='warning'),
-                        ui.navigate.to('/admin'),
-                    ),
-                )
-                ui.button(
-                    'Rensa ENDAST resultat (dragning)',
-                    on_click=lambda: (
-                        core.clear_allocations(),
-                        ui.notify('Resultat rensat', color='warning'),
-                        ui.navigate.to('/admin'),
-                    ),
+            async def clear_all():
+                await core_aio.run(core.clear_items_and_votes_and_allocations)
+                ui.notify('Allt rensat', color='warning')
+                ui.navigate.to('/admin')
+
+            async def clear_results():
+                await core_aio.run(core.clear_allocations)
+                ui.notify('Resultat rensat', color='warning')
+                ui.navigate.to('/admin')
+
+            async def compact():
+                # VACUUM låser databasen en stund, så inte under pågående röstning
+                res = await core_aio.run(core.compact_db, None, True)
+                ui.notify(
+                    f"Tog bort {res['pruned_runs']} gamla dragningar, databasen "
+                    f"{res['bytes_before'] / 1e6:.1f} MB -> {res['bytes_after'] / 1e6:.1f} MB",
+                    color='positive',
                 )
+                ui.navigate.to('/admin')
+
+            with ui.row().classes('gap-3 items-center'):
+                ui.button('Rensa allt (artiklar + röster + resultat)', on_click=clear_all)
+                ui.button('Rensa ENDAST resultat (alla dragningar)', on_click=clear_results)
+                ui.button(f'Komprimera databas (behåll {core.RUNS_KEEP or "alla"} dragningar)', on_click=compact)
 
             ui.separator()
             ui.label('Ladda upp artiklar (Excel/CSV)').classes('text-md font-semibold')
             ui.markdown('Förväntade kolumner: `name`, `category` (valfri), `quantity` (valfri).')
 
             status = ui.label()
+            upload_bar = ui.linear_progress(value=0, show_value=False).classes('w-full')
+            upload_bar.set_visibility(False)
+
+            def show_import_progress(rows: int, fraction) -> None:
+                status.text = f'Importerar… {rows} rader'
+                if fraction is not None:
+                    upload_bar.value = fraction
+
+            async def read_upload(e) -> bytes:
+                # Hämta bytes-innehåll (stöd för flera NiceGUI-versioner)
+                data = None
+
+                # Äldre/stabilt exempel: e.content.read() förekommer ofta i exempel <inref id="460adb18"/>
+                if hasattr(e, 'content') and e.content is not None:
+                    data = e.content.read()
+
+                # Nyare format: e.file = SmallFileUpload(..., _data=b'...') syns i diskussioner <inref id="008e2517"/>
+                elif hasattr(e, 'file') and e.file is not None:
+                    f = e.file
+                    if hasattr(f, 'read') and callable(f.read):
+                        data = await f.read()
+                    elif hasattr(f, 'content'):
+                        data = f.content  # kan vara bytes
+                    elif hasattr(f, '_data'):
+                        data = f._data
+                    else:
+                        raise ValueError('Kan inte läsa filinnehåll från e.file')
+
+                else:
+                    raise ValueError('Upload-eventet saknar både content och file')
+
+                if not isinstance(data, (bytes, bytearray)):
+                    raise ValueError(f'Fel datatyp på uppladdad fil: {type(data)}')
+                return bytes(data)
 
             async def handle_upload(e):
                 try:
@@ -97,46 +143,27 @@ def register_admin_pages() -> None:
                     if not name:
                         raise ValueError('Kan inte läsa filnamn från upload-eventet')
 
-                    # 2) Hämta bytes-innehåll (stöd för flera NiceGUI-versioner)
-                    data = None
-
-                    # Äldre/stabilt exempel: e.content.read() förekommer ofta i exempel <inref id="460adb18"/>
-                    if hasattr(e, 'content') and e.content is not None:
-                        data = e.content.read()
-
-                    # Nyare format: e.file = SmallFileUpload(..., _data=b'...') syns i diskussioner <inref id="008e2517"/>
-                    elif hasattr(e, 'file') and e.file is not None:
-                        f = e.file
-                        if hasattr(f, 'read') and callable(f.read):
-                            data = await f.read()
-                        elif hasattr(f, 'content'):
-                            data = f.content  # kan vara bytes
-                        elif hasattr(f, '_data'):
-                            data = f._data
-                        else:
-                            raise ValueError('Kan inte läsa filinnehåll från e.file')
-
-                    else:
-                        raise ValueError('Upload-eventet saknar både content och file')
-
-                    if not isinstance(data, (bytes, bytearray)):
-                        raise ValueError(f'Fel datatyp på uppladdad fil: {type(data)}')
+                    # 2) Stor fil som NiceGUI redan sparat på disk: läs direkt från filen
+                    path = getattr(getattr(e, 'file', None), '_path', None)
+                    source = str(path) if path is not None else io.BytesIO(await read_upload(e))
 
-                    # 3) Parsea + importera
-                    df = core.parse_items_file(bytes(data), name)
-                    core.clear_items_and_votes_and_allocations()
+                    # 3) Importera i bakgrunden; sidan (och alla andras) svarar under tiden
+                    upload_bar.value = 0
+                    upload_bar.set_visibility(True)
+                    res = await core_aio.import_items_file(source, name, progress=show_import_progress)
 
-                    params = [
-                        (str(r['name']), str(r.get('category', '')), int(r.get('quantity', 1)))
-                        for _, r in df.iterrows()
-                    ]
-                    core.exec_many('INSERT INTO items(name, category, quantity) VALUES(?, ?, ?)', params)
-
-                    ui.notify(f'Artiklar importerade: {len(df)} rader. Röster/resultat rensades.', color='positive')
+                    ui.notify(
+                        f'Artiklar importerade: {res.rows} rader ({res.rows_per_sec:.0f} rader/s). '
+                        'Röster/resultat rensades.',
+                        color='positive',
+                    )
                     ui.navigate.to('/admin')
 
                 except Exception as ex:
                     ui.notify(str(ex), color='negative')
+                finally:
+                    upload_bar.set_visibility(False)
+                    status.text = ''
 
             ui.upload(on_upload=handle_upload, auto_upload=True).props('accept=.xlsx,.xls,.csv')
 
@@ -144,16 +171,12 @@ def register_admin_pages() -> None:
         with ui.card().classes('w-full'):
             ui.label('2) Översikt och deltagare').classes('text-lg font-medium')
             items = core.list_items()
-            parts = core.list_participants()
+            parts = core.list_participants_with_vote_summary()
 
             ui.label(f'Artiklar: {len(items)}')
             ui.label(f'Deltagare: {len(parts)}')
 
-            submitted = 0
-            for p in parts:
-                pid = int(p['id'])
-                if core.participant_has_submitted(pid) and core.vote_sum_for_participant(pid) == core.POINT_BUDGET:
-                    submitted += 1
+            submitted = sum(1 for p in parts if p['submitted'] and int(p['vote_sum']) == core.POINT_BUDGET)
             ui.label(f'Inlämnade (summa = {core.POINT_BUDGET}): {submitted}/{len(parts)}')
 
             ui.separator()
@@ -167,7 +190,7 @@ def register_admin_pages() -> None:
                 value=None,
             ).classes('w-full max-w-md')
 
-            def do_delete():
+            async def do_delete():
                 if not del_sel.value:
                     ui.notify('Välj en deltagare', color='negative')
                     return
@@ -175,7 +198,7 @@ def register_admin_pages() -> None:
                 if pid2 is None:
                     ui.notify('Hittar inte deltagaren', color='negative')
                     return
-                core.delete_participant(pid2)
+                await core_aio.run(core.delete_participant, pid2)
                 ui.notify(f'Tog bort: {del_sel.value}', color='warning')
                 ui.navigate.to('/admin')
 
@@ -186,10 +209,21 @@ def register_admin_pages() -> None:
             ui.label('3) Artiklar (totala poäng)').classes('text-lg font-medium')
             ui.markdown('Uppdateras automatiskt. Visar hela artikel-listan samt totalpoäng (summa av alla deltagares poäng).')
 
-            @ui.refreshable
-            def items_view() -> None:
+            items_table = LiveTable(
+                columns=[
+                    {'name': 'Kategori', 'label': 'Kategori', 'field': 'Kategori', 'sortable': True},
+                    {'name': 'Artikel', 'label': 'Artikel', 'field': 'Artikel', 'sortable': True},
+                    {'name': 'Antal', 'label': 'Antal', 'field': 'Antal', 'sortable': True},
+                    {'name': 'Totalpoäng', 'label': 'Totalpoäng', 'field': 'Totalpoäng', 'sortable': True},
+                    {'name': 'Antal röstande', 'label': 'Antal röstande', 'field': 'Antal röstande', 'sortable': True},
+                ],
+                row_key='Artikel',
+            )
+
+            @metrics.instrument('refresh', 'admin.items')
+            def update_items() -> None:
                 items = core.list_items_with_point_totals()
-                item_rows = [
+                items_table.set_rows([
                     {
                         'Kategori': r['category'] or '',
                         'Artikel': r['name'],
@@ -198,168 +232,260 @@ def register_admin_pages() -> None:
                         'Antal röstande': int(r['voters']),
                     }
                     for r in items
-                ]
-
-                ui.table(
-                    columns=[
-                        {'name': 'Kategori', 'label': 'Kategori', 'field': 'Kategori', 'sortable': True},
-                        {'name': 'Artikel', 'label': 'Artikel', 'field': 'Artikel', 'sortable': True},
-                        {'name': 'Antal', 'label': 'Antal', 'field': 'Antal', 'sortable': True},
-                        {'name': 'Totalpoäng', 'label': 'Totalpoäng', 'field': 'Totalpoäng', 'sortable': True},
-                        {'name': 'Antal röstande', 'label': 'Antal röstande', 'field': 'Antal röstande', 'sortable': True},
-                    ],
-                    rows=item_rows,
-                    row_key='Artikel',
-                ).classes('w-full')
-
-            items_view()
-            ui.timer(1.0, items_view.refresh)
+                ])
+
+            update_items()
+            core.subscribe(
+                ('items_version', 'votes_version'),
+                lambda _topics: update_items(),
+                alive=lambda: not items_table.table.is_deleted,
+                min_interval=0.5,
+            )
 
-        # 4) Röster (översikt) – live-uppdatering via ui.refreshable (NiceGUI 3.8)
+        # 4) Röster (översikt) – live-uppdatering; tabell och urval behålls, bara ändrade rader skickas
         with ui.card().classes('w-full'):
             ui.label('4) Röster (översikt)').classes('text-lg font-medium')
             ui.markdown('Uppdateras automatiskt. Välj en deltagare för att se deras poäng per artikel.')
 
             # Behåll urval mellan uppdateringar
-            state = {'selected_name': None}
-
-            @ui.refreshable
-            def votes_view() -> None:
-                parts = core.list_participants()
-                names = [str(p['name']) for p in parts]
-                name_by_id = {int(p['id']): str(p['name']) for p in parts}
-
-                # Välj default om inget valt / valt namn finns inte längre
-                if not state['selected_name'] or state['selected_name'] not in names:
-                    state['selected_name'] = names[0] if names else None
-
-                rows = []
-                for p in parts:
-                    pid = int(p['id'])
-                    s = core.vote_sum_for_participant(pid)
-                    rows.append({
-                        'Deltagare': str(p['name']),
-                        'Summa': s,
-                        'Inlämnad': 'Ja' if s == core.POINT_BUDGET else 'Nej',
-                    })
+            state = {'selected_name': None, 'name_by_id': {}, 'sum_by_id': {}, 'details_sig': None}
 
-                ui.table(
-                    columns=[
-                        {'name': 'Deltagare', 'label': 'Deltagare', 'field': 'Deltagare', 'sortable': True},
-                        {'name': 'Summa', 'label': 'Summa', 'field': 'Summa', 'sortable': True},
-                        {'name': 'Inlämnad', 'label': 'Inlämnad', 'field': 'Inlämnad', 'sortable': True},
-                    ],
-                    rows=rows,
-                    row_key='Deltagare',
-                ).classes('w-full')
+            votes_table = LiveTable(
+                columns=[
+                    {'name': 'Deltagare', 'label': 'Deltagare', 'field': 'Deltagare', 'sortable': True},
+                    {'name': 'Summa', 'label': 'Summa', 'field': 'Summa', 'sortable': True},
+                    {'name': 'Inlämnad', 'label': 'Inlämnad', 'field': 'Inlämnad', 'sortable': True},
+                ],
+                row_key='Deltagare',
+            )
 
-                ui.separator()
-                sel = ui.select(
-                    label='Visa röster för deltagare',
-                    options=names,
-                    value=state['selected_name'],
-                ).classes('w-full max-w-md')
+            ui.separator()
+            sel = ui.select(
+                label='Visa röster för deltagare',
+                options=[],
+                value=None,
+            ).classes('w-full max-w-md')
 
-                details = ui.column().classes('w-full')
+            details = ui.column().classes('w-full')
 
-                def render_details() -> None:
-                    details.clear()
-                    selected_name = sel.value
-                    state['selected_name'] = selected_name
-                    if not selected_name:
-                        return
+            @metrics.instrument('refresh', 'admin.details')
+            def render_details() -> None:
+                selected_name = sel.value
+                state['selected_name'] = selected_name
 
-                    pid = None
-                    for k, v in name_by_id.items():
+                pid = None
+                if selected_name:
+                    for k, v in state['name_by_id'].items():
                         if v == selected_name:
                             pid = k
                             break
-                    if pid is None:
-                        return
 
+                dv = []
+                total = 0
+                if pid is not None:
                     votes = core.get_votes_detailed(pid)
                     dv = [
                         {'Kategori': r['category'] or '', 'Artikel': r['item_name'], 'Poäng': int(r['points'])}
                         for r in votes
                         if int(r['points']) > 0
                     ]
+                    total = state['sum_by_id'].get(pid, 0)
 
-                    with details:
-                        ui.label(f'Röster för: {selected_name}').classes('text-md font-semibold')
-                        ui.label(f'Summa: {core.vote_sum_for_participant(pid)}/{core.POINT_BUDGET}')
-                        if not dv:
-                            ui.label('Inga poäng satta (eller allt är 0).')
-                        else:
-                            ui.table(
-                                columns=[
-                                    {'name': 'Kategori', 'label': 'Kategori', 'field': 'Kategori', 'sortable': True},
-                                    {'name': 'Artikel', 'label': 'Artikel', 'field': 'Artikel', 'sortable': True},
-                                    {'name': 'Poäng', 'label': 'Poäng', 'field': 'Poäng', 'sortable': True},
-                                ],
-                                rows=dv,
-                                row_key='Artikel',
-                            ).classes('w-full')
-
-                sel.on('update:model-value', lambda e: render_details())
+                # Rita bara om när urval eller innehåll ändrats
+                sig = (pid, selected_name, total, rows_signature(dv))
+                if sig == state['details_sig']:
+                    return
+                state['details_sig'] = sig
+
+                details.clear()
+                if pid is None:
+                    return
+
+                with details:
+                    ui.label(f'Röster för: {selected_name}').classes('text-md font-semibold')
+                    ui.label(f'Summa: {total}/{core.POINT_BUDGET}')
+                    if not dv:
+                        ui.label('Inga poäng satta (eller allt är 0).')
+                    else:
+                        ui.table(
+                            columns=[
+                                {'name': 'Kategori', 'label': 'Kategori', 'field': 'Kategori', 'sortable': True},
+                                {'name': 'Artikel', 'label': 'Artikel', 'field': 'Artikel', 'sortable': True},
+                                {'name': 'Poäng', 'label': 'Poäng', 'field': 'Poäng', 'sortable': True},
+                            ],
+                            rows=dv,
+                            row_key='Artikel',
+                        ).classes('w-full')
+
+            @metrics.instrument('refresh', 'admin.votes')
+            def update_votes() -> None:
+                parts = core.list_participants_with_vote_summary()
+                names = [str(p['name']) for p in parts]
+                state['name_by_id'] = {int(p['id']): str(p['name']) for p in parts}
+                state['sum_by_id'] = {int(p['id']): int(p['vote_sum']) for p in parts}
+
+                # Välj default om inget valt / valt namn finns inte längre
+                if not state['selected_name'] or state['selected_name'] not in names:
+                    state['selected_name'] = names[0] if names else None
+
+                rows = []
+                for p in parts:
+                    s = int(p['vote_sum'])
+                    rows.append({
+                        'Deltagare': str(p['name']),
+                        'Summa': s,
+                        'Inlämnad': 'Ja' if s == core.POINT_BUDGET else 'Nej',
+                    })
+                votes_table.set_rows(rows)
+
+                if list(sel.options) != names or sel.value != state['selected_name']:
+                    sel.set_options(names, value=state['selected_name'])
                 render_details()
 
-            votes_view()
-            ui.timer(1.0, votes_view.refresh)
+            sel.on('update:model-value', lambda e: render_details())
+            update_votes()
+            core.subscribe(
+                ('participants_version', 'votes_version'),
+                lambda _topics: update_votes(),
+                alive=lambda: not votes_table.table.is_deleted,
+                min_interval=0.5,
+            )
 
         # 5) Kör dragning
         with ui.card().classes('w-full'):
             ui.label('5) Kör dragning').classes('text-lg font-medium')
             seed_in = ui.input('Seed (valfri men rekommenderas)', value=str(int(time.time())))
 
-            def do_draw():
+            draw_label = ui.label()
+            draw_bar = ui.linear_progress(value=0, show_value=False).classes('w-full')
+            with ui.row().classes('w-full gap-3'):
+                draw_btn = ui.button('Dra vinnare').classes('grow')
+                cancel_btn = ui.button('Avbryt dragning').props('color=negative')
+
+            # Dragningen körs som jobb (draw_jobs); kortet följer senaste jobbet live
+            job_seen: dict = {'id': None, 'status': None}
+
+            def job_text(job: dict) -> str:
+                if job['cancel_requested']:
+                    return 'Avbryter…'
+                if job['status'] == 'queued':
+                    return 'I kö…'
+                if job['status'] == 'running':
+                    if job['phase'] == 'A':
+                        return f"Fas A: {job['done']}/{job['total']} deltagare"
+                    if job['phase'] == 'B':
+                        return f"Fas B: {job['done']}/{job['total']} units"
+                    return 'Läser in röster…'
+                if job['status'] == 'done':
+                    return f"Senaste dragning klar (seed={job['seed']})"
+                if job['status'] == 'failed':
+                    return f"Senaste dragning misslyckades: {job['error']}"
+                return 'Senaste dragning avbröts'
+
+            @metrics.instrument('refresh', 'admin.job')
+            def render_job() -> None:
+                job = draw_jobs.latest()
+                active = job is not None and job['status'] in draw_jobs.ACTIVE_STATES
+                draw_btn.set_enabled(not active)
+                cancel_btn.set_visibility(active)
+                draw_bar.set_visibility(active)
+                if job is None:
+                    draw_label.text = ''
+                    return
+
+                draw_label.text = job_text(job)
+                draw_bar.value = job['done'] / job['total'] if job['total'] else 0
+
+                # Jobbet blev klart medan sidan var öppen
+                finished = (
+                    job_seen['id'] == job['id']
+                    and job_seen['status'] in draw_jobs.ACTIVE_STATES
+                    and not active
+                )
+                job_seen.update(id=job['id'], status=job['status'])
+                if finished:
+                    with draw_label:
+                        if job['status'] == 'done':
+                            ui.notify(f"Dragning klar (seed={job['seed']})", color='positive')
+                            ui.navigate.to('/admin')
+                        else:
+                            ui.notify(job_text(job), color='negative' if job['status'] == 'failed' else 'warning')
+
+            async def do_draw():
                 try:
                     seed = seed_in.value or str(int(time.time()))
-                    res = core.run_draw(seed)
-                    ui.notify(f'Dragning klar (seed={res.seed})', color='positive')
-                    ui.navigate.to('/admin')
+                    await core_aio.run(draw_jobs.start, seed)
                 except Exception as ex:
                     ui.notify(str(ex), color='negative')
 
-            ui.button('Dra vinnare', on_click=do_draw).classes('w-full')
+            async def do_cancel():
+                if job_seen['id'] is not None:
+                    await core_aio.run(draw_jobs.cancel, job_seen['id'])
+
+            draw_btn.on_click(do_draw)
+            cancel_btn.on_click(do_cancel)
+            render_job()
+            core.subscribe(
+                (draw_jobs.TOPIC,),
+                lambda _topics: render_job(),
+                alive=lambda: not draw_label.is_deleted,
+                min_interval=0.2,
+            )
 
         # 6) Resultat
         with ui.card().classes('w-full'):
             ui.label('6) Resultat').classes('text-lg font-medium')
-            run_id = core.get_latest_run_id()
-            if not run_id:
+            runs = core.list_runs()
+            if not runs:
                 ui.label('Ingen dragning gjord ännu.')
                 return
 
-            rows = core.get_results(run_id)
+            run_labels = {
+                r['id']: f"{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(r['created_at']))}  (seed {r['seed']})"
+                for r in runs
+            }
+            if len(runs) > 1:
+                ui.select(
+                    label='Dragning (senaste först)',
+                    options=run_labels,
+                    value=runs[0]['id'],
+                    on_change=lambda e: results_view.refresh(e.value),
+                ).classes('w-full max-w-md')
 
-            ui.label('Per artikel').classes('text-md font-semibold')
-            per_item = []
-            for r in rows:
-                per_item.append({'Kategori': r['category'] or '', 'Artikel': r['item_name'], 'Vinnare': r['participant_name'] or '(resthög)'})
-            ui.table(
-                columns=[
-                    {'name': 'Kategori', 'label': 'Kategori', 'field': 'Kategori', 'sortable': True},
-                    {'name': 'Artikel', 'label': 'Artikel', 'field': 'Artikel', 'sortable': True},
-                    {'name': 'Vinnare', 'label': 'Vinnare', 'field': 'Vinnare', 'sortable': True},
-                ],
-                rows=per_item,
-                row_key='Artikel',
-            ).classes('w-full')
+            @ui.refreshable
+            def results_view(run_id: str) -> None:
+                rows = core.get_results(run_id)
 
-            ui.separator()
-            ui.label('Per deltagare').classes('text-md font-semibold')
-            by_p: Dict[str, List[str]] = {}
-            for r in rows:
-                pn = r['participant_name'] or '(resthög)'
-                by_p.setdefault(pn, []).append(r['item_name'])
-            per_p = [{'Deltagare': k, 'Antal': len(v), 'Artiklar': ', '.join(sorted(v))} for k, v in by_p.items()]
-            per_p.sort(key=lambda x: (-x['Antal'], x['Deltagare'].lower()))
-            ui.table(
-                columns=[
-                    {'name': 'Deltagare', 'label': 'Deltagare', 'field': 'Deltagare', 'sortable': True},
-                    {'name': 'Antal', 'label': 'Antal', 'field': 'Antal', 'sortable': True},
-                    {'name': 'Artiklar', 'label': 'Artiklar', 'field': 'Artiklar'},
-                ],
-                rows=per_p,
-                row_key='Deltagare',
-            ).classes('w-full')
+                ui.label('Per artikel').classes('text-md font-semibold')
+                per_item = []
+                for r in rows:
+                    per_item.append({'Kategori': r['category'] or '', 'Artikel': r['item_name'], 'Vinnare': r['participant_name'] or '(resthög)'})
+                ui.table(
+                    columns=[
+                        {'name': 'Kategori', 'label': 'Kategori', 'field': 'Kategori', 'sortable': True},
+                        {'name': 'Artikel', 'label': 'Artikel', 'field': 'Artikel', 'sortable': True},
+                        {'name': 'Vinnare', 'label': 'Vinnare', 'field': 'Vinnare', 'sortable': True},
+                    ],
+                    rows=per_item,
+                    row_key='Artikel',
+                ).classes('w-full')
+
+                ui.separator()
+                ui.label('Per deltagare').classes('text-md font-semibold')
+                by_p: Dict[str, List[str]] = {}
+                for r in rows:
+                    pn = r['participant_name'] or '(resthög)'
+                    by_p.setdefault(pn, []).append(r['item_name'])
+                per_p = [{'Deltagare': k, 'Antal': len(v), 'Artiklar': ', '.join(sorted(v))} for k, v in by_p.items()]
+                per_p.sort(key=lambda x: (-x['Antal'], x['Deltagare'].lower()))
+                ui.table(
+                    columns=[
+                        {'name': 'Deltagare', 'label': 'Deltagare', 'field': 'Deltagare', 'sortable': True},
+                        {'name': 'Antal', 'label': 'Antal', 'field': 'Antal', 'sortable': True},
+                        {'name': 'Artiklar', 'label': 'Artiklar', 'field': 'Artiklar'},
+                    ],
+                    rows=per_p,
+                    row_key='Deltagare',
+                ).classes('w-full')
+
+            results_view(runs[0]['id'])
@@ -0,0 +1,42 @@
+# language: python
+"""ui_common.py
+
+Delade UI-hjälpare för ui_user.py och ui_admin.py.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+from typing import Any, Dict, List, Optional
+
+from nicegui import ui
+
+
+def rows_signature(rows: List[Dict[str, Any]]) -> str:
+    """Innehållshash för tabellrader (ordningskänslig)."""
+    raw = json.dumps(rows, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.blake2b(raw.encode('utf-8'), digest_size=16).hexdigest()
+
+
+class LiveTable:
+    """ui.table som lever kvar mellan uppdateringar.
+
+    set_rows() skickar bara nya rader till klienten när innehållet faktiskt
+    ändrats; identiska uppdateringar kostar en hash och ingen websocket-trafik.
+    """
+
+    def __init__(self, columns: List[Dict[str, Any]], row_key: str, rows: Optional[List[Dict[str, Any]]] = None) -> None:
+        self._sig: Optional[str] = None
+        self.table = ui.table(columns=columns, rows=[], row_key=row_key).classes('w-full')
+        if rows is not None:
+            self.set_rows(rows)
+
+    def set_rows(self, rows: List[Dict[str, Any]]) -> bool:
+        sig = rows_signature(rows)
+        if sig == self._sig:
+            return False
+        self._sig = sig
+        self.table.rows = rows
+        self.table.update()
+        return True
@@ -12,14 +12,18 @@ Funktioner:
 - Byt användare (rensa session)
 - Sticky knapp i botten som visas efter godkänd sparning och länkar till /totals
 - /totals auto-navigerar till /results så fort admin kört dragning
-- /results auto-uppdaterar 1 gång/sekund
+- /totals och /results uppdateras när datat ändras (core.subscribe), inte genom polling;
+  tabellerna behålls och nya rader skickas bara när innehållet ändrats
 """
 
 from __future__ import annotations
 
 from nicegui import ui, app
 
-import oldcore.core as core
+import core
+import core_aio
+import metrics
+from ui_common import LiveTable
 
 
 def register_user_pages() -> None:
@@ -47,9 +51,9 @@ def register_user_pages() -> None:
         with ui.card().classes('w-full max-w-md'):
             name = ui.input('Namn').props('autofocus')
 
-            def do_register():
+            async def do_register():
                 try:
-                    pid2 = core.get_or_create_participant(name.value or '')
+                    pid2 = await core_aio.run(core.get_or_create_participant, name.value or '')
                 except Exception as e:
                     ui.notify(str(e), color='negative')
                     return
@@ -190,7 +194,7 @@ def register_user_pages() -> None:
             for ed in editors.values():
                 ed.on('update:model-value', lambda e, _ed=ed: on_any_change())
 
-            def save():
+            async def save():
                 MIN_VOTED_ITEMS = 10  # minst så många artiklar måste ha >0 poäng
 
                 votes: dict[int, int] = {}
@@ -219,7 +223,8 @@ def register_user_pages() -> None:
                     return
 
                 try:
-                    core.upsert_votes(int(pid), votes)
+                    # kan få vänta på skrivlåset (t.ex. under en dragning); loopen blockeras inte
+                    await core_aio.run(core.upsert_votes, int(pid), votes)
                 except Exception as ex:
                     ui.notify(str(ex), color='negative')
                     return
@@ -252,10 +257,21 @@ def register_user_pages() -> None:
 
         info = ui.label('Väntar på att admin ska köra dragning… (sidan uppdateras automatiskt)')
 
-        @ui.refreshable
-        def items_view() -> None:
+        items_table = LiveTable(
+            columns=[
+                {'name': 'Kategori', 'label': 'Kategori', 'field': 'Kategori', 'sortable': True},
+                {'name': 'Artikel', 'label': 'Artikel', 'field': 'Artikel', 'sortable': True},
+                {'name': 'Antal', 'label': 'Antal', 'field': 'Antal', 'sortable': True},
+                {'name': 'Totalpoäng', 'label': 'Totalpoäng', 'field': 'Totalpoäng', 'sortable': True},
+                {'name': 'Antal röstande', 'label': 'Antal röstande', 'field': 'Antal röstande', 'sortable': True},
+            ],
+            row_key='ID',
+        )
+
+        @metrics.instrument('refresh', 'totals.items')
+        def update_items() -> None:
             items2 = core.list_items_with_point_totals()
-            item_rows = [
+            items_table.set_rows([
                 {
                     'ID': int(r['id']),
                     'Kategori': r['category'] or '',
@@ -265,33 +281,30 @@ def register_user_pages() -> None:
                     'Antal röstande': int(r['voters']),
                 }
                 for r in items2
-            ]
-
-            ui.table(
-                columns=[
-                    {'name': 'Kategori', 'label': 'Kategori', 'field': 'Kategori', 'sortable': True},
-                    {'name': 'Artikel', 'label': 'Artikel', 'field': 'Artikel', 'sortable': True},
-                    {'name': 'Antal', 'label': 'Antal', 'field': 'Antal', 'sortable': True},
-                    {'name': 'Totalpoäng', 'label': 'Totalpoäng', 'field': 'Totalpoäng', 'sortable': True},
-                    {'name': 'Antal röstande', 'label': 'Antal röstande', 'field': 'Antal röstande', 'sortable': True},
-                ],
-                rows=item_rows,
-                row_key='ID',
-            ).classes('w-full')
+            ])
 
-        items_view()
+        update_items()
 
-        def tick() -> None:
-            # 1) uppdatera totals-tabellen
-            items_view.refresh()
+        if core.get_latest_run_id():
+            info.text = 'Dragning hittad – öppnar resultat…'
+            ui.navigate.to('/results')
+            return
 
-            # 2) om admin kört dragning -> gå automatiskt till results
-            run_id = core.get_latest_run_id()
-            if run_id:
-                info.text = 'Dragning hittad – öppnar resultat…'
-                ui.navigate.to('/results')
+        def on_change(topics) -> None:
+            # om admin kört dragning -> gå automatiskt till results
+            if 'alloc_version' in topics and core.get_latest_run_id():
+                with info:
+                    info.text = 'Dragning hittad – öppnar resultat…'
+                    ui.navigate.to('/results')
+                return
+            update_items()
 
-        ui.timer(1.0, tick)
+        core.subscribe(
+            ('items_version', 'votes_version', 'alloc_version'),
+            on_change,
+            alive=lambda: not info.is_deleted,
+            min_interval=0.5,
+        )
 
     @ui.page('/results')
     def results_page():
@@ -317,42 +330,61 @@ def register_user_pages() -> None:
 
         status = ui.label()
 
+        # Layouten byggs om bara när aktuell dragning byts; annars uppdateras raderna i befintliga tabeller
+        view: dict = {'run_id': core.get_latest_run_id(), 'per_item': None, 'per_p': None}
+
         @ui.refreshable
         def results_view() -> None:
-            run_id = core.get_latest_run_id()
+            run_id = view['run_id']
+            view['per_item'] = view['per_p'] = None
             if not run_id:
                 status.text = 'Ingen dragning gjord ännu.'
                 ui.label('Väntar på dragning…').classes('text-md')
                 return
 
-            rows = core.get_results(run_id)
             status.text = f'Aktuell dragning: {run_id} (auto-uppdateras)'
 
             ui.separator()
             ui.label('Per artikel').classes('text-md font-semibold')
 
-            per_item = []
-            for r in rows:
-                per_item.append({
-                    'AllocID': int(r['id']),
-                    'Kategori': r['category'] or '',
-                    'Artikel': r['item_name'],
-                    'Vinnare': r['participant_name'] or '(resthög)',
-                })
-
-            ui.table(
+            view['per_item'] = LiveTable(
                 columns=[
                     {'name': 'Kategori', 'label': 'Kategori', 'field': 'Kategori', 'sortable': True},
                     {'name': 'Artikel', 'label': 'Artikel', 'field': 'Artikel', 'sortable': True},
                     {'name': 'Vinnare', 'label': 'Vinnare', 'field': 'Vinnare', 'sortable': True},
                 ],
-                rows=per_item,
                 row_key='AllocID',
-            ).classes('w-full')
+            )
 
             ui.separator()
             ui.label('Per deltagare').classes('text-md font-semibold')
 
+            view['per_p'] = LiveTable(
+                columns=[
+                    {'name': 'Deltagare', 'label': 'Deltagare', 'field': 'Deltagare', 'sortable': True},
+                    {'name': 'Antal', 'label': 'Antal', 'field': 'Antal', 'sortable': True},
+                    {'name': 'Artiklar', 'label': 'Artiklar', 'field': 'Artiklar'},
+                ],
+                row_key='Deltagare',
+            )
+
+        @metrics.instrument('refresh', 'results.results')
+        def update_results() -> None:
+            run_id = view['run_id']
+            if not run_id:
+                return
+            rows = core.get_results(run_id)
+
+            per_item = []
+            for r in rows:
+                per_item.append({
+                    'AllocID': int(r['id']),
+                    'Kategori': r['category'] or '',
+                    'Artikel': r['item_name'],
+                    'Vinnare': r['participant_name'] or '(resthög)',
+                })
+            view['per_item'].set_rows(per_item)
+
             by_p: dict[str, list[str]] = {}
             for r in rows:
                 pn = r['participant_name'] or '(resthög)'
@@ -360,16 +392,17 @@ def register_user_pages() -> None:
 
             per_p = [{'Deltagare': k, 'Antal': len(v), 'Artiklar': ', '.join(sorted(v))} for k, v in by_p.items()]
             per_p.sort(key=lambda x: (-x['Antal'], x['Deltagare'].lower()))
-
-            ui.table(
-                columns=[
-                    {'name': 'Deltagare', 'label': 'Deltagare', 'field': 'Deltagare', 'sortable': True},
-                    {'name': 'Antal', 'label': 'Antal', 'field': 'Antal', 'sortable': True},
-                    {'name': 'Artiklar', 'label': 'Artiklar', 'field': 'Artiklar'},
-                ],
-                rows=per_p,
-                row_key='Deltagare',
-            ).classes('w-full')
+            view['per_p'].set_rows(per_p)
 
         results_view()
-        ui.timer(1.0, results_view.refresh)
\ No newline at end of file
+        update_results()
+
+        def on_change(_topics) -> None:
+            run_id = core.get_latest_run_id()
+            if run_id != view['run_id']:
+                view['run_id'] = run_id
+                with status:
+                    results_view.refresh()
+            update_results()
+
+        core.subscribe(('alloc_version',), on_change, alive=lambda: not status.is_deleted, min_interval=0.5)